@@ -5,4 +5,5 @@ __all__ = [
     "processing",
     "filters",
     "output",
+    "ratelimit",
 ]
\ No newline at end of file
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
 import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from typing import Callable, Any
 
@@ -9,28 +15,113 @@ import pandas as pd
 from .config import DEFAULT_CONFIG
 
 
+@lru_cache(maxsize=4096)
+def _key_digest(key: str) -> str:
+    # 缓存key仅用于生成文件名，无安全需求：使用8字节BLAKE2b代替SHA-256
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
 class CacheManager:
-    def __init__(self, base_dir: Path | None = None):
-        self.base_dir = base_dir or DEFAULT_CONFIG.cache_dir
-        self.base_dir.mkdir(parents=True, exist_ok=True)
+    """DataFrame磁盘缓存，前置进程内LRU内存缓存，避免重复反序列化同一DataFrame。
 
-    def _key_to_path(self, key: str) -> Path:
-        safe = hashlib.sha256(key.encode("utf-8")).hexdigest()
-        return self.base_dir / f"{safe}.pkl"
+    内存层保存独立副本，读取时也返回副本，调用方可以原地修改返回值而不污染缓存。
+    磁盘格式优先使用 Feather(zstd)；无法以 Feather 存储的数据（如混合类型列）回退为 pickle。
+    """
 
-    def load_df(self, key: str) -> pd.DataFrame | None:
+    def __init__(self, base_dir: Path | None = None, mem_maxsize: int = 256):
+        self.base_dir = base_dir or DEFAULT_CONFIG.cache_dir
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.mem_maxsize = mem_maxsize
+        # key -> (写入时间戳, DataFrame)；从磁盘载入的条目以文件 mtime 作为写入时间
+        self._mem: OrderedDict[str, tuple[float, pd.DataFrame]] = OrderedDict()
+        self._mem_lock = threading.Lock()
+
+    def _remember(self, key: str, df: pd.DataFrame, saved_at: float) -> None:
+        with self._mem_lock:
+            self._mem[key] = (saved_at, df)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.mem_maxsize:
+                self._mem.popitem(last=False)
+
+    def _key_to_path(self, key: str, suffix: str = ".feather") -> Path:
+        return self.base_dir / f"{_key_digest(key)}{suffix}"
+
+    def load_df(self, key: str, max_age: float | None = None) -> pd.DataFrame | None:
+        """读取缓存；max_age（秒）不为 None 时，写入时间早于该时长的条目视为过期。"""
+        now = time.time()
+        with self._mem_lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if max_age is not None and now - hit[0] > max_age:
+                    return None
+                self._mem.move_to_end(key)
+                return hit[1].copy()
         path = self._key_to_path(key)
-        if path.exists():
-            try:
-                return pd.read_pickle(path)
-            except Exception:
+        legacy = self._key_to_path(key, ".pkl")
+        try:
+            if path.exists():
+                saved_at = path.stat().st_mtime
+                if max_age is not None and now - saved_at > max_age:
+                    return None
+                df = pd.read_feather(path)
+            elif legacy.exists():
+                saved_at = legacy.stat().st_mtime
+                if max_age is not None and now - saved_at > max_age:
+                    return None
+                with legacy.open("rb") as f:
+                    df = pickle.load(f)
+            else:
                 return None
-        return None
+        except Exception:
+            return None
+        self._remember(key, df.copy(), saved_at)
+        return df
 
     def save_df(self, key: str, df: pd.DataFrame) -> None:
+        self._remember(key, df.copy(), time.time())
         path = self._key_to_path(key)
         try:
-            df.to_pickle(path)
+            df.reset_index(drop=True).to_feather(path, compression="zstd")
+            return
+        except Exception:
+            path.unlink(missing_ok=True)
+        try:
+            df.to_pickle(self._key_to_path(key, ".pkl"), protocol=5)
+        except Exception:
+            pass
+
+    def clear(self) -> int:
+        """清空内存缓存与磁盘缓存文件，返回删除的文件数。
+
+        仅删除 base_dir 顶层的缓存文件，不触及 ui/、realtime/ 等子目录中的状态与日志。
+        """
+        with self._mem_lock:
+            self._mem.clear()
+        removed = 0
+        for path in self.base_dir.iterdir():
+            if path.is_file() and path.suffix in (".feather", ".pkl", ".json"):
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def load_codes(self, key: str) -> list[str] | None:
+        """读取以JSON单独保存的代码列表，避免仅为取一列而反序列化整个DataFrame。"""
+        path = self._key_to_path(key, ".json")
+        if not path.exists():
+            return None
+        try:
+            codes = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        return [str(c) for c in codes] if isinstance(codes, list) else None
+
+    def save_codes(self, key: str, codes: list[str]) -> None:
+        path = self._key_to_path(key, ".json")
+        try:
+            path.write_text(json.dumps(list(codes), ensure_ascii=False), encoding="utf-8")
         except Exception:
             pass
 
@@ -38,24 +129,58 @@ class CacheManager:
 cache = CacheManager()
 
 
-def cacheable_df(key_builder: Callable[..., str]):
+def cacheable_df(key_builder: Callable[..., str | None], max_age: Callable[..., float | None] | None = None):
     """简单的DataFrame磁盘缓存装饰器。
 
-    key_builder: 根据函数入参构造缓存key的函数
+    key_builder: 根据函数入参构造缓存key的函数；返回 None 表示本次调用不读写缓存
+    max_age: 可选，根据函数入参给出缓存有效期（秒），返回 None 表示永久有效
     """
 
     def decorator(func: Callable[..., pd.DataFrame]):
         def wrapper(*args: Any, use_cache: bool = True, **kwargs: Any) -> pd.DataFrame:
+            if not use_cache:
+                return func(*args, **kwargs)
             key = key_builder(*args, **kwargs)
-            if use_cache:
-                cached = cache.load_df(key)
-                if cached is not None and not cached.empty:
-                    return cached
+            if key is None:
+                return func(*args, **kwargs)
+            cached = cache.load_df(key, max_age=max_age(*args, **kwargs) if max_age is not None else None)
+            if cached is not None and len(cached) > 0:
+                return cached
             df = func(*args, **kwargs)
-            if use_cache and df is not None and not df.empty:
+            if df is not None and len(df) > 0:
                 cache.save_df(key, df)
             return df
 
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def _detached(value: Any) -> Any:
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+def ttl_cache(ttl: float):
+    """进程内按位置参数缓存函数结果 ttl 秒，用于不随日期变化的实时榜单接口。
+
+    调用抛出异常时不缓存；DataFrame 结果按副本存取，调用方可原地修改。
+    """
+
+    def decorator(func: Callable[..., Any]):
+        store: dict = {}
+        lock = threading.Lock()
+
+        def wrapper(*args: Any) -> Any:
+            now = time.monotonic()
+            with lock:
+                hit = store.get(args)
+            if hit is not None and now - hit[0] < ttl:
+                return _detached(hit[1])
+            value = func(*args)
+            with lock:
+                store[args] = (now, _detached(value))
+            return value
+
+        return wrapper
+
+    return decorator
@@ -20,6 +20,7 @@ class Config:
     # 数据获取控制
     max_symbols_for_hist: int | None = None  # None表示全部A股
     per_request_sleep_sec: float = 0.2
+    fetch_max_workers: int = 8  # 逐票拉取历史日线时的并发线程数
 
     # 指标过滤配置
     enable_indicator_filter: bool = True
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import datetime as dt
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -11,7 +14,33 @@ except Exception as e:  # pragma: no cover
     raise RuntimeError("akshare 未安装或导入失败，请先安装 akshare") from e
 
 from .config import DEFAULT_CONFIG
-from .cache import cacheable_df
+from .cache import cacheable_df, cache
+from .ratelimit import TokenBucket
+
+__all__ = [
+    "AKSHARE_LIMITER",
+    "set_request_interval",
+    "get_realtime_spot",
+    "get_historical_market",
+    "get_symbol_hist_range",
+    "list_a_stock_codes",
+    "to_em_symbol",
+    "to_em_symbols",
+]
+
+
+def _rate_for(sleep_sec: float) -> float:
+    return 1.0 / sleep_sec if sleep_sec > 0 else 0.0
+
+
+# 进程内所有 akshare 单票/榜单请求共用一个令牌桶：平均每 per_request_sleep_sec 秒一次，允许少量突发。
+# 只在真正发起网络请求处 acquire，缓存命中不消耗令牌。
+AKSHARE_LIMITER = TokenBucket(rate=_rate_for(DEFAULT_CONFIG.per_request_sleep_sec), capacity=3)
+
+
+def set_request_interval(sleep_sec: float) -> None:
+    """调整共享令牌桶的请求间隔；上游限频针对整个进程，因此对所有调用方同时生效。"""
+    AKSHARE_LIMITER.set_rate(_rate_for(float(sleep_sec)))
 
 
 def _prefix_for_code(code: str) -> str:
@@ -29,6 +58,21 @@ def to_em_symbol(code: str) -> str:
     return f"{_prefix_for_code(code)}{code}"
 
 
+# 按代码首字符(ASCII)查交易所前缀，规则与 _prefix_for_code 一致
+_PREFIX_LUT = np.full(256, "sz", dtype="<U2")
+_PREFIX_LUT[ord("6")] = "sh"
+_PREFIX_LUT[[ord("4"), ord("8")]] = "bj"
+
+
+def to_em_symbols(codes) -> np.ndarray:
+    """to_em_symbol 的向量化版本：对整列代码一次性查表拼接前缀。"""
+    arr = np.char.strip(np.asarray(codes, dtype=str))
+    if arr.size == 0:
+        return arr
+    first = arr.astype("S1").view(np.uint8)
+    return np.char.add(_PREFIX_LUT[first], arr)
+
+
 @cacheable_df(lambda provider="em": f"realtime_spot_{provider}")
 def get_realtime_spot(provider: str = "em", use_cache: bool = True) -> pd.DataFrame:
     """获取A股实时行情快照。
@@ -92,117 +136,183 @@ def get_realtime_spot(provider: str = "em", use_cache: bool = True) -> pd.DataFr
 
 
 def list_a_stock_codes() -> List[str]:
+    # 代码列表按自然日单独缓存为JSON，key带日期以便跨日自动失效
+    key = f"a_stock_codes_{dt.date.today().strftime('%Y%m%d')}"
+    codes = cache.load_codes(key)
+    if codes:
+        return codes
     spot = get_realtime_spot(use_cache=True)
     codes = spot["代码"].astype(str).tolist()
+    if codes:
+        cache.save_codes(key, codes)
     return codes
 
 
-@cacheable_df(lambda date, **_: f"market_hist_{date}")
+# 各数据源日线列名 -> 统一列名
+_HIST_RENAME = {
+    "date": "日期",
+    "收盘": "close",
+    "涨跌幅": "pct_chg",
+    "成交量": "volume",
+    "开盘": "open",
+    "最高": "high",
+    "最低": "low",
+    "成交额": "amount",
+    "换手率": "turnover",
+}
+
+
+def _unify_hist_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """原地统一日线列名（akshare每次返回新DataFrame，无需复制）。"""
+    if df is None or df.empty:
+        return pd.DataFrame()
+    cols = set(df.columns)
+    # 目标列已存在时不重命名，避免产生重复列
+    plan = {src: dst for src, dst in _HIST_RENAME.items() if src in cols and dst not in cols}
+    if plan:
+        df.rename(columns=plan, inplace=True)
+    if "日期" not in df.columns or "close" not in df.columns:
+        return pd.DataFrame()
+    return df
+
+
+def _month_window(date: str) -> tuple[str, str]:
+    """目标日所在自然月的区间；当月区间截止到今天，避免缓存未来日期。"""
+    d = dt.datetime.strptime(date, "%Y%m%d").date()
+    start = d.replace(day=1)
+    month_end = (start + dt.timedelta(days=32)).replace(day=1) - dt.timedelta(days=1)
+    end = max(min(month_end, dt.date.today()), d)
+    return start.strftime("%Y%m%d"), end.strftime("%Y%m%d")
+
+
+def _rows_on_date(df: pd.DataFrame, date: str) -> pd.DataFrame:
+    """取 日期 等于 date（YYYYMMDD）的行。
+
+    日线按日期升序时用二分查找定位，否则退回整列比较；均按 datetime64 比较，不再逐行格式化字符串。
+    """
+    dates = df["日期"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
+    index = pd.DatetimeIndex(dates)
+    target = pd.Timestamp(date)
+    if index.is_monotonic_increasing:
+        lo = index.searchsorted(target, side="left")
+        hi = index.searchsorted(target, side="right")
+        return df.iloc[lo:hi].copy()
+    return df[index == target].copy()
+
+
+def _fetch_daily_one(code: str, symbol: str, date: str) -> pd.DataFrame | None:
+    """取单只股票指定日期的日线。
+
+    按自然月整段拉取（东方财富 -> 新浪 -> 腾讯 依次回退）并写入缓存，
+    同月其他日期直接从缓存切片，不再发起网络请求。
+    """
+    prefix = symbol[:2]
+    start, end = _month_window(date)
+    key = f"hist_month_{code}_{start}_{end}"
+    month_df = cache.load_df(key)
+    if month_df is None or month_df.empty:
+        sources = [
+            ("em", lambda: ak.stock_zh_a_hist(symbol=symbol, period="daily", start_date=start, end_date=end, adjust="")),
+            ("sina", lambda: ak.stock_zh_a_daily(symbol=f"{prefix}{code}", start_date=start, end_date=end, adjust="")),
+            ("tx", lambda: ak.stock_zh_a_hist_tx(symbol=f"{prefix}{code}", start_date=start, end_date=end, adjust="")),
+        ]
+        month_df = None
+        for source_name, fetch_func in sources:
+            try:
+                with AKSHARE_LIMITER:
+                    df = fetch_func()
+                df = _unify_hist_columns(df)
+            except Exception:
+                continue
+            if df is not None and not df.empty:
+                df["source"] = source_name
+                month_df = df
+                cache.save_df(key, month_df)
+                break
+    if month_df is None:
+        return None
+    day_df = _rows_on_date(month_df, date)
+    if day_df.empty:
+        return None
+    day_df["代码"] = code
+    day_df["symbol"] = symbol
+    return day_df
+
+
+def _today_str() -> str:
+    return dt.date.today().strftime("%Y%m%d")
+
+
+def _market_from_spot(date: str, max_symbols: Optional[int]) -> pd.DataFrame:
+    """当日全市场日线直接由实时快照（单次批量请求）整理得到。"""
+    # 快照缓存不带日期也无过期时间，必须实时拉取，否则可能把旧快照标记为今天
+    spot = get_realtime_spot(use_cache=False)
+    if spot is None or spot.empty or "代码" not in spot.columns:
+        return pd.DataFrame()
+    if max_symbols is not None:
+        spot = spot.head(max_symbols)
+    rename_map = {
+        "最新价": "close",
+        "今开": "open",
+        "最高": "high",
+        "最低": "low",
+        "成交量": "volume",
+        "成交额": "amount",
+        "换手率": "turnover",
+    }
+    out = spot.rename(columns={k: v for k, v in rename_map.items() if k in spot.columns and v not in spot.columns})
+    out["代码"] = out["代码"].astype(str).str.replace(r"^(sh|sz|bj)", "", regex=True)
+    out["日期"] = dt.datetime.strptime(date, "%Y%m%d").strftime("%Y-%m-%d")
+    out["symbol"] = to_em_symbols(out["代码"].to_numpy())
+    out["source"] = out["data_source"] if "data_source" in out.columns else "spot"
+    return out.reset_index(drop=True)
+
+
+# 当日数据盘中仍在变化，不写入磁盘缓存
+@cacheable_df(lambda date, **_: None if date == _today_str() else f"market_hist_{date}")
 def get_historical_market(
     date: str,
     use_cache: bool = True,
     max_symbols: Optional[int] = DEFAULT_CONFIG.max_symbols_for_hist,
-    sleep_seconds: float = DEFAULT_CONFIG.per_request_sleep_sec,
+    max_workers: int = DEFAULT_CONFIG.fetch_max_workers,
 ) -> pd.DataFrame:
     """按指定日期聚合全市场历史日线数据。
 
     说明：akshare不提供“过去日期的全市场快照”接口，只能逐个代码拉取日线。
-    优先使用东方财富；若单票失败或为空，自动回退到新浪与腾讯；统一输出必要列。
+    - 目标日为今天：直接使用实时快照，一次请求覆盖全市场；
+    - 历史日期：按月整段拉取并缓存，同月其他日期无需再请求网络；
+      优先使用东方财富，失败时回退到新浪与腾讯；统一输出必要列。
+    逐票请求为阻塞I/O，使用线程池并发拉取，总请求速率由进程共享的 AKSHARE_LIMITER 约束（见 set_request_interval）。
     """
+    if date == _today_str():
+        return _market_from_spot(date, max_symbols)
+
     codes = list_a_stock_codes()
     if max_symbols is not None:
         codes = codes[:max_symbols]
 
-    records: list[pd.DataFrame] = []
-    for code in codes:
-        def _unify_columns(df: pd.DataFrame) -> pd.DataFrame:
-            if df is None or df.empty:
-                return pd.DataFrame()
-            out = df.copy()
-            if "日期" not in out.columns and "date" in out.columns:
-                out.rename(columns={"date": "日期"}, inplace=True)
-            if "close" not in out.columns and "收盘" in out.columns:
-                out.rename(columns={"收盘": "close"}, inplace=True)
-            # 尽量统一常见列
-            rename_map = {
-                "涨跌幅": "pct_chg",
-                "成交量": "volume",
-                "开盘": "open",
-                "最高": "high",
-                "最低": "low",
-                "成交额": "amount",
-            }
-            for src, dst in rename_map.items():
-                if src in out.columns and dst not in out.columns:
-                    out.rename(columns={src: dst}, inplace=True)
-            if "日期" not in out.columns or "close" not in out.columns:
-                return pd.DataFrame()
-            return out
-
-        symbol = to_em_symbol(code)
-        got: pd.DataFrame | None = None
-        # 1) 东方财富
-        try:
-            df_em = ak.stock_zh_a_hist(symbol=symbol, period="daily", start_date=date, end_date=date, adjust="")
-            df_em = _unify_columns(df_em)
-            if df_em is not None and not df_em.empty:
-                df_em["source"] = "em"
-                got = df_em
-        except Exception:
-            pass
-
-        # 2) 新浪
-        if got is None or got.empty:
-            try:
-                prefix = _prefix_for_code(code)
-                df_sina = ak.stock_zh_a_daily(symbol=f"{prefix}{code}", start_date=date, end_date=date, adjust="")
-                df_sina = _unify_columns(df_sina)
-                if df_sina is not None and not df_sina.empty:
-                    df_sina["source"] = "sina"
-                    got = df_sina
-            except Exception:
-                pass
-
-        # 3) 腾讯
-        if got is None or got.empty:
-            try:
-                prefix = _prefix_for_code(code)
-                df_tx = ak.stock_zh_a_hist_tx(symbol=f"{prefix}{code}", start_date=date, end_date=date, adjust="")
-                df_tx = _unify_columns(df_tx)
-                if df_tx is not None and not df_tx.empty:
-                    df_tx["source"] = "tx"
-                    got = df_tx
-            except Exception:
-                pass
-
-        if got is not None and not got.empty:
-            got["代码"] = code
-            got["symbol"] = symbol
-            records.append(got)
-
-        time.sleep(sleep_seconds)
+    codes = [str(c).strip() for c in codes]
+    symbols = to_em_symbols(codes).tolist()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(lambda code, symbol: _fetch_daily_one(code, symbol, date), codes, symbols))
 
+    records: list[pd.DataFrame] = [df for df in results if df is not None and len(df) > 0]
     if not records:
         return pd.DataFrame()
-    out = pd.concat(records, ignore_index=True)
-    # 标准化核心列名
-    rename_map = {
-        "涨跌幅": "pct_chg",
-        "成交量": "volume",
-        "成交额": "amount",
-        "收盘": "close",
-        "开盘": "open",
-        "最高": "high",
-        "最低": "low",
-        "换手率": "turnover",
-    }
-    for k, v in rename_map.items():
-        if k in out.columns:
-            out.rename(columns={k: v}, inplace=True)
-    return out
+    # 各记录已由 _unify_hist_columns 统一列名，合并后无需再次重命名
+    return pd.concat(records, ignore_index=True)
+
+
+# 截止日不早于今天的区间盘中仍会变化：磁盘缓存只在此时长内视为新鲜；更早的区间永久有效
+HIST_RANGE_TODAY_MAX_AGE_SEC = 15 * 60
 
 
-@cacheable_df(lambda symbol_code, start_date, end_date: f"hist_range_{symbol_code}_{start_date}_{end_date}")
+@cacheable_df(
+    lambda symbol_code, start_date, end_date: f"hist_range_{symbol_code}_{start_date}_{end_date}",
+    max_age=lambda symbol_code, start_date, end_date: HIST_RANGE_TODAY_MAX_AGE_SEC if end_date >= _today_str() else None,
+)
 def get_symbol_hist_range(symbol_code: str, start_date: str, end_date: str, use_cache: bool = True) -> pd.DataFrame:
     """获取单只股票区间日线数据，便于技术指标与量能比较。
 
@@ -210,39 +320,13 @@ def get_symbol_hist_range(symbol_code: str, start_date: str, end_date: str, use_
     所有数据源统一输出包含列：`日期`、`close`，并附加 `代码` 列。
     """
 
-    def _unify_columns(df: pd.DataFrame) -> pd.DataFrame:
-        if df is None or df.empty:
-            return pd.DataFrame()
-        out = df.copy()
-        # 日期列统一
-        if "日期" not in out.columns and "date" in out.columns:
-            out.rename(columns={"date": "日期"}, inplace=True)
-        # 收盘价统一
-        if "close" not in out.columns and "收盘" in out.columns:
-            out.rename(columns={"收盘": "close"}, inplace=True)
-        # 其他常用列统一（非强制，仅尽量统一）
-        rename_map = {
-            "涨跌幅": "pct_chg",
-            "成交量": "volume",
-            "开盘": "open",
-            "最高": "high",
-            "最低": "low",
-            "成交额": "amount",
-        }
-        for src, dst in rename_map.items():
-            if src in out.columns and dst not in out.columns:
-                out.rename(columns={src: dst}, inplace=True)
-        # 保证必要列存在
-        if "日期" not in out.columns or "close" not in out.columns:
-            return pd.DataFrame()
-        return out
-
     code = symbol_code.strip()
     symbol_em = to_em_symbol(code)
     # 1) 东方财富
     try:
-        df_em = ak.stock_zh_a_hist(symbol=symbol_em, period="daily", start_date=start_date, end_date=end_date, adjust="")
-        df_em = _unify_columns(df_em)
+        with AKSHARE_LIMITER:
+            df_em = ak.stock_zh_a_hist(symbol=symbol_em, period="daily", start_date=start_date, end_date=end_date, adjust="")
+        df_em = _unify_hist_columns(df_em)
         if df_em is not None and not df_em.empty:
             df_em["代码"] = code
             df_em["source"] = "em"
@@ -253,8 +337,9 @@ def get_symbol_hist_range(symbol_code: str, start_date: str, end_date: str, use_
     # 2) 新浪（日线，需带交易所前缀）
     try:
         prefix = _prefix_for_code(code)
-        df_sina = ak.stock_zh_a_daily(symbol=f"{prefix}{code}", start_date=start_date, end_date=end_date, adjust="")
-        df_sina = _unify_columns(df_sina)
+        with AKSHARE_LIMITER:
+            df_sina = ak.stock_zh_a_daily(symbol=f"{prefix}{code}", start_date=start_date, end_date=end_date, adjust="")
+        df_sina = _unify_hist_columns(df_sina)
         if df_sina is not None and not df_sina.empty:
             df_sina["代码"] = code
             df_sina["source"] = "sina"
@@ -265,8 +350,9 @@ def get_symbol_hist_range(symbol_code: str, start_date: str, end_date: str, use_
     # 3) 腾讯（日线，需带交易所前缀）
     try:
         prefix = _prefix_for_code(code)
-        df_tx = ak.stock_zh_a_hist_tx(symbol=f"{prefix}{code}", start_date=start_date, end_date=end_date, adjust="")
-        df_tx = _unify_columns(df_tx)
+        with AKSHARE_LIMITER:
+            df_tx = ak.stock_zh_a_hist_tx(symbol=f"{prefix}{code}", start_date=start_date, end_date=end_date, adjust="")
+        df_tx = _unify_hist_columns(df_tx)
         if df_tx is not None and not df_tx.empty:
             df_tx["代码"] = code
             df_tx["source"] = "tx"
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba 为可选加速依赖
+    njit = None
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # pragma: no cover - scipy 为可选加速依赖
+    lfilter = None
+
 from .data_fetch import get_symbol_hist_range
+from .processing import offset_days
 
 
 def top_percentile(df: pd.DataFrame, percentile: float = 90.0, column: str = "pct_chg") -> pd.DataFrame:
@@ -12,26 +24,35 @@ def top_percentile(df: pd.DataFrame, percentile: float = 90.0, column: str = "pc
     return df[df[column] >= threshold].copy().reset_index(drop=True)
 
 
+def _as_datetime(dates: pd.Series) -> pd.Series:
+    # 缓存命中的日线（feather）日期列已是 datetime64，此时不再重复解析
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates, errors="coerce")
+
+
 def compute_volume_surge_ratio(code: str, date: str, lookback_days: int = 5) -> float | None:
     """计算成交量相对过去N日均值的放大倍数。"""
     # 拉取日期前后区间，保证包含目标日与之前若干日
-    hist = get_symbol_hist_range(code, start_date=_offset_days(date, lookback_days + 1), end_date=date)
+    hist = get_symbol_hist_range(code, start_date=offset_days(date, lookback_days + 1), end_date=date)
     if hist.empty or "volume" not in hist.columns:
         return None
-    hist = hist.copy()
-    hist = hist.sort_values(by="日期")
-    # 目标日成交量
-    today_row = hist[hist["日期"] == date]
-    if today_row.empty:
-        return None
-    today_vol = float(today_row.iloc[0]["volume"]) if "volume" in today_row.columns else None
-    if today_vol is None:
+    # 以有序DatetimeIndex定位目标日与之前N日，避免整列字符串比较
+    volume = pd.Series(
+        pd.to_numeric(hist["volume"], errors="coerce").to_numpy(),
+        index=_as_datetime(hist["日期"]),
+    )
+    volume = volume[volume.index.notna()].sort_index()
+    target = pd.Timestamp(date)
+    pos = volume.index.searchsorted(target)
+    if pos >= len(volume) or volume.index[pos] != target:
         return None
+    today_vol = float(volume.iat[pos])
     # 过去N日均量（不含目标日）
-    past = hist[hist["日期"] < date].tail(lookback_days)
+    past = volume.iloc[max(0, pos - lookback_days):pos]
     if past.empty:
         return None
-    avg_vol = float(past["volume"].mean())
+    avg_vol = float(past.mean())
     if avg_vol == 0:
         return None
     return today_vol / avg_vol
@@ -49,15 +70,156 @@ def filter_volume_surge(df: pd.DataFrame, date: str, min_ratio: float = 2.0) ->
     return out[out["volume_surge_ratio"] >= min_ratio].copy().reset_index(drop=True)
 
 
-def _offset_days(date: str, n: int) -> str:
-    # 简单地向前偏移n天（自然日），不考虑节假日，足够覆盖数据
-    import datetime as dt
+def _rsi_kernel(close: np.ndarray, window: int) -> np.ndarray:
+    """单遍滑窗RSI：维护窗口内涨跌幅之和，与 rolling(window).mean() 口径一致。"""
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    up_sum = 0.0
+    down_sum = 0.0
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        if d > 0:
+            up_sum += d
+        else:
+            down_sum -= d
+        if i > window:
+            d_old = close[i - window] - close[i - window - 1]
+            if d_old > 0:
+                up_sum -= d_old
+            else:
+                down_sum += d_old
+        if i >= window:
+            rs = (up_sum / window) / (down_sum / window + 1e-9)
+            out[i] = 100.0 - 100.0 / (1.0 + rs)
+    return out
+
+
+def _ewma_kernel(x: np.ndarray, span: int) -> np.ndarray:
+    """单遍EWMA，等价于 ewm(span=span, adjust=False).mean()。"""
+    alpha = 2.0 / (span + 1.0)
+    n = x.shape[0]
+    out = np.empty(n)
+    if n == 0:
+        return out
+    out[0] = x[0]
+    for i in range(1, n):
+        out[i] = alpha * x[i] + (1.0 - alpha) * out[i - 1]
+    return out
+
+
+def _rsi_macd_last_kernel(close: np.ndarray, window: int, fast: int, slow: int, signal: int) -> tuple:
+    """单遍计算末值 (RSI, MACD柱)，口径分别与 compute_rsi / compute_macd 的最后一行一致。"""
+    n = close.shape[0]
+    if n == 0:
+        return np.nan, np.nan
+    rsi = np.nan
+    if n > window:
+        up_sum = 0.0
+        down_sum = 0.0
+        for i in range(n - window, n):
+            d = close[i] - close[i - 1]
+            if d > 0:
+                up_sum += d
+            else:
+                down_sum -= d
+        rs = (up_sum / window) / (down_sum / window + 1e-9)
+        rsi = 100.0 - 100.0 / (1.0 + rs)
+    a_fast = 2.0 / (fast + 1.0)
+    a_slow = 2.0 / (slow + 1.0)
+    a_sig = 2.0 / (signal + 1.0)
+    ema_fast = close[0]
+    ema_slow = close[0]
+    macd = 0.0
+    sig = 0.0
+    for i in range(1, n):
+        ema_fast = a_fast * close[i] + (1.0 - a_fast) * ema_fast
+        ema_slow = a_slow * close[i] + (1.0 - a_slow) * ema_slow
+        macd = ema_fast - ema_slow
+        sig = a_sig * macd + (1.0 - a_sig) * sig
+    return rsi, macd - sig
+
+
+def _rsi_macd_kernel(close: np.ndarray, window: int, fast: int, slow: int, signal: int) -> tuple:
+    """单遍同时计算完整的 RSI 与 MACD柱 序列，口径与 compute_rsi / compute_macd 一致。"""
+    n = close.shape[0]
+    rsi = np.full(n, np.nan)
+    hist = np.empty(n)
+    if n == 0:
+        return rsi, hist
+    a_fast = 2.0 / (fast + 1.0)
+    a_slow = 2.0 / (slow + 1.0)
+    a_sig = 2.0 / (signal + 1.0)
+    ema_fast = close[0]
+    ema_slow = close[0]
+    sig = 0.0
+    hist[0] = 0.0
+    up_sum = 0.0
+    down_sum = 0.0
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        if d > 0:
+            up_sum += d
+        else:
+            down_sum -= d
+        if i > window:
+            d_old = close[i - window] - close[i - window - 1]
+            if d_old > 0:
+                up_sum -= d_old
+            else:
+                down_sum += d_old
+        if i >= window:
+            rs = (up_sum / window) / (down_sum / window + 1e-9)
+            rsi[i] = 100.0 - 100.0 / (1.0 + rs)
+        ema_fast = a_fast * close[i] + (1.0 - a_fast) * ema_fast
+        ema_slow = a_slow * close[i] + (1.0 - a_slow) * ema_slow
+        macd = ema_fast - ema_slow
+        sig = a_sig * macd + (1.0 - a_sig) * sig
+        hist[i] = macd - sig
+    return rsi, hist
+
+
+def _rsi_macd_batch_kernel(values: np.ndarray, offsets: np.ndarray, window: int, fast: int, slow: int, signal: int) -> tuple:
+    """多只股票的收盘价首尾相接存放，按 offsets 分段逐只计算，一次调用完成全部。"""
+    rsi = np.empty(values.shape[0])
+    hist = np.empty(values.shape[0])
+    for k in range(offsets.shape[0] - 1):
+        a = offsets[k]
+        b = offsets[k + 1]
+        r, h = _rsi_macd_kernel(values[a:b], window, fast, slow, signal)
+        rsi[a:b] = r
+        hist[a:b] = h
+    return rsi, hist
 
-    d = dt.datetime.strptime(date, "%Y%m%d")
-    return (d - dt.timedelta(days=n)).strftime("%Y%m%d")
+
+if njit is not None:
+    _rsi_macd_kernel = njit(cache=True)(_rsi_macd_kernel)
+    _rsi_macd_batch_kernel = njit(cache=True)(_rsi_macd_batch_kernel)
+    _rsi_kernel = njit(cache=True)(_rsi_kernel)
+    _ewma_kernel = njit(cache=True)(_ewma_kernel)
+    _rsi_macd_last_kernel = njit(cache=True)(_rsi_macd_last_kernel)
+    # 导入时预编译，避免首次轮询承担JIT开销
+    _rsi_macd_last_kernel(np.zeros(2), 1, 1, 2, 1)
+
+
+def _no_missing(close: pd.Series) -> bool:
+    # 快速路径仅处理无缺失值的序列；缺失值的传播口径以pandas为准
+    return isinstance(close, pd.Series) and not close.isna().any()
+
+
+def _ewma(x: np.ndarray, span: int) -> np.ndarray:
+    """EWMA(adjust=False)：优先用scipy的C实现IIR滤波，否则用JIT内核。"""
+    if lfilter is None or x.shape[0] == 0:
+        return _ewma_kernel(x, span)
+    alpha = 2.0 / (span + 1.0)
+    # y[n] = alpha*x[n] + (1-alpha)*y[n-1]，初值使 y[0] = x[0]
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * x[0]])
+    return y
 
 
 def compute_rsi(close: pd.Series, window: int = 14) -> pd.Series:
+    if njit is not None and _no_missing(close):
+        values = close.to_numpy(dtype=np.float64)
+        return pd.Series(_rsi_kernel(values, window), index=close.index, name=close.name)
     delta = close.diff()
     up = delta.clip(lower=0)
     down = -delta.clip(upper=0)
@@ -69,9 +231,63 @@ def compute_rsi(close: pd.Series, window: int = 14) -> pd.Series:
 
 
 def compute_macd(close: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
+    if (lfilter is not None or njit is not None) and _no_missing(close):
+        values = close.to_numpy(dtype=np.float64)
+        macd = _ewma(values, fast) - _ewma(values, slow)
+        signal_line = _ewma(macd, signal)
+        out = np.column_stack((macd, signal_line, macd - signal_line))
+        return pd.DataFrame(out, index=close.index, columns=["macd", "signal", "hist"])
     ema_fast = close.ewm(span=fast, adjust=False).mean()
     ema_slow = close.ewm(span=slow, adjust=False).mean()
     macd = ema_fast - ema_slow
     signal_line = macd.ewm(span=signal, adjust=False).mean()
     hist = macd - signal_line
-    return pd.DataFrame({"macd": macd, "signal": signal_line, "hist": hist})
\ No newline at end of file
+    return pd.DataFrame({"macd": macd, "signal": signal_line, "hist": hist})
+
+
+def compute_rsi_macd(close: pd.Series, window: int = 14, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple[np.ndarray, np.ndarray]:
+    """返回完整的 (RSI, MACD柱) 数组；有 numba 且无缺失值时单遍计算。"""
+    if njit is not None and _no_missing(close):
+        return _rsi_macd_kernel(close.to_numpy(dtype=np.float64), window, fast, slow, signal)
+    rsi = compute_rsi(close, window=window)
+    macd_df = compute_macd(close, fast=fast, slow=slow, signal=signal)
+    return rsi.to_numpy(dtype=np.float64), macd_df["hist"].to_numpy(dtype=np.float64)
+
+
+def compute_rsi_macd_batch(closes: dict[str, np.ndarray], window: int = 14, fast: int = 12, slow: int = 26, signal: int = 9) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """批量计算多只股票完整的 (RSI, MACD柱)，返回 {代码: (rsi, hist)}。
+
+    各股票交易日不同，不对齐成宽表（对齐产生的缺失值会改变滑窗口径），
+    而是首尾拼接成一个数组由 JIT 内核分段处理；含缺失值的序列单独走 pandas 口径。
+    """
+    out: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    batch: dict[str, np.ndarray] = {}
+    for code, close in closes.items():
+        close = np.asarray(close, dtype=np.float64)
+        if njit is not None and not np.isnan(close).any():
+            batch[code] = close
+        else:
+            out[code] = compute_rsi_macd(pd.Series(close), window=window, fast=fast, slow=slow, signal=signal)
+    if batch:
+        lengths = np.fromiter((a.shape[0] for a in batch.values()), dtype=np.int64, count=len(batch))
+        offsets = np.zeros(len(batch) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        rsi, hist = _rsi_macd_batch_kernel(np.concatenate(list(batch.values())), offsets, window, fast, slow, signal)
+        for k, code in enumerate(batch):
+            a, b = offsets[k], offsets[k + 1]
+            out[code] = (rsi[a:b], hist[a:b])
+    return out
+
+
+def compute_rsi_macd_last(close: pd.Series, window: int = 14, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple[float | None, float | None]:
+    """仅返回最后一个交易日的 (RSI, MACD柱)，供只关心末值的过滤使用。"""
+    if njit is not None and _no_missing(close):
+        if close.shape[0] == 0:
+            return None, None
+        rsi, hist = _rsi_macd_last_kernel(close.to_numpy(dtype=np.float64), window, fast, slow, signal)
+        return float(rsi), float(hist)
+    rsi_series = compute_rsi(close, window=window)
+    macd_df = compute_macd(close, fast=fast, slow=slow, signal=signal)
+    rsi_val = float(rsi_series.iloc[-1]) if not rsi_series.empty else None
+    macd_val = float(macd_df["hist"].iloc[-1]) if not macd_df.empty else None
+    return rsi_val, macd_val
@@ -19,7 +19,7 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--top_percent", type=float, default=DEFAULT_CONFIG.top_percent, help="涨幅前X%阈值")
     p.add_argument("--vol_ratio", type=float, default=DEFAULT_CONFIG.volume_surge_ratio, help="量能放大倍数阈值")
     p.add_argument("--max_symbols", type=int, default=DEFAULT_CONFIG.max_symbols_for_hist or 0, help="历史模式最大股票数，0表示全部")
-    p.add_argument("--output", type=str, default="csv,json", help="输出格式，逗号分隔：csv,json,xlsx")
+    p.add_argument("--output", type=str, default="csv,json", help="输出格式，逗号分隔：csv,json,xlsx,parquet")
     p.add_argument("--strategy", type=str, choices=["basic", "comprehensive"], default="basic", help="筛选策略：basic=原逻辑；comprehensive=现成榜单+龙虎榜+板块补充")
     p.add_argument("--no_indicators", action="store_true", help="综合策略下关闭RSI/MACD指标过滤")
     return p.parse_args()
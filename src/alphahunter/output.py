@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import atexit
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 import pandas as pd
+import matplotlib
+
+matplotlib.use("Agg")  # 仅输出图片文件，无需GUI后端
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选加速依赖
+    orjson = None
+
 from .config import DEFAULT_CONFIG
 
 
@@ -14,35 +25,116 @@ def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+# 结果文件在后台线程写出，不阻塞后续绘图/打印；进程退出前统一等待完成
+_WRITER = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alphahunter-writer")
+_PENDING: list[tuple[Path, Future]] = []
+
+
+def wait_pending_writes() -> None:
+    """等待所有后台写出任务完成（失败已在任务结束时打印）。"""
+    while _PENDING:
+        _, fut = _PENDING.pop(0)
+        try:
+            fut.result()
+        except Exception:
+            pass
+
+
+def _report_failure(path: Path):
+    def _callback(fut: Future) -> None:
+        # 写出失败时立即打印，而不是等到进程退出
+        exc = fut.exception()
+        if exc is not None:
+            print(f"[失败] 写出 {path} 出错: {exc}")
+
+    return _callback
+
+
+atexit.register(wait_pending_writes)
+
+
+def _write_json(df: pd.DataFrame, path: Path) -> None:
+    if orjson is not None:
+        try:
+            payload = orjson.dumps(
+                df.to_dict(orient="records"),
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            payload = None
+        if payload is not None:
+            path.write_bytes(payload)
+            return
+    df.to_json(path, orient="records", force_ascii=False)
+
+
 def save_results(df: pd.DataFrame, base_name: str, formats: list[str] | None = None) -> list[Path]:
+    """按格式异步写出结果，返回目标路径列表。
+
+    写出在后台线程完成，返回时文件可能尚未生成；需要读取文件时先调用 wait_pending_writes()。
+    后台写出的是 df 的快照，调用方之后修改 df 不影响已提交的写出。
+    支持 csv/json/xlsx/parquet；parquet 写出速度远快于 xlsx。
+    """
     formats = formats or ["csv", "json"]
     ensure_dir(DEFAULT_CONFIG.output_dir)
+    df = df.copy()
     saved: list[Path] = []
     for fmt in formats:
         out_path = DEFAULT_CONFIG.output_dir / f"{base_name}.{fmt}"
         if fmt == "csv":
-            df.to_csv(out_path, index=False)
+            fut = _WRITER.submit(df.to_csv, out_path, index=False)
         elif fmt == "json":
-            df.to_json(out_path, orient="records", force_ascii=False)
+            fut = _WRITER.submit(_write_json, df, out_path)
         elif fmt == "xlsx":
-            df.to_excel(out_path, index=False)
+            fut = _WRITER.submit(df.to_excel, out_path, index=False)
+        elif fmt == "parquet":
+            fut = _WRITER.submit(df.to_parquet, out_path, index=False)
         else:
             continue
+        fut.add_done_callback(_report_failure(out_path))
+        _PENDING.append((out_path, fut))
         saved.append(out_path)
     return saved
 
 
+def _top_n_positions(series: pd.Series, top_n: int) -> np.ndarray:
+    """与 nlargest 等价的前N行位置（降序、忽略缺失值），用 argpartition 避免全量排序。"""
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+    if 0 < top_n < len(valid):
+        candidates = values[valid]
+        kth = -np.partition(-candidates, top_n - 1)[top_n - 1]
+        greater = valid[candidates > kth]
+        # 边界值并列时与 nlargest(keep="first") 一致，取靠前者
+        ties = valid[candidates == kth][: top_n - len(greater)]
+        valid = np.sort(np.concatenate((greater, ties)))
+    elif top_n <= 0:
+        valid = valid[:0]
+    return valid[np.argsort(-values[valid], kind="stable")]
+
+
+_FIG_AX: tuple | None = None
+
+
+def _get_axes():
+    """复用同一个Figure/Axes，避免每次绘图重复创建与销毁。"""
+    global _FIG_AX
+    if _FIG_AX is None:
+        _FIG_AX = plt.subplots(figsize=(10, 6))
+    return _FIG_AX
+
+
 def plot_top_n_bar(df: pd.DataFrame, value_col: str, name_col: str = "代码", top_n: int = 20, title: Optional[str] = None) -> Path | None:
     if df.empty or value_col not in df.columns:
         return None
     ensure_dir(DEFAULT_CONFIG.output_dir)
-    plot_df = df.nlargest(top_n, value_col)
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=plot_df, x=name_col, y=value_col)
-    plt.xticks(rotation=90)
-    plt.title(title or f"Top {top_n} by {value_col}")
-    plt.tight_layout()
+    plot_df = df.iloc[_top_n_positions(df[value_col], top_n)]
+    fig, ax = _get_axes()
+    ax.clear()
+    sns.barplot(data=plot_df, x=name_col, y=value_col, ax=ax)
+    ax.tick_params(axis="x", rotation=90)
+    ax.set_title(title or f"Top {top_n} by {value_col}")
+    fig.tight_layout()
     out_path = DEFAULT_CONFIG.output_dir / f"chart_{value_col}.png"
-    plt.savefig(out_path)
-    plt.close()
+    fig.savefig(out_path)
     return out_path
\ No newline at end of file
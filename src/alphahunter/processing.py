@@ -1,29 +1,51 @@
 from __future__ import annotations
 
+import datetime as dt
+
 import pandas as pd
 
 
 def _to_numeric(series: pd.Series) -> pd.Series:
-    return pd.to_numeric(series.astype(str).str.replace("%", "", regex=False), errors="coerce")
+    # 已是数值类型时直接返回，避免逐元素转成Python字符串
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    out = pd.to_numeric(series.astype("string").str.rstrip("%"), errors="coerce")
+    return out.astype("float64")
+
+
+def ensure_numeric(series: pd.Series) -> pd.Series:
+    """已是数值列（缓存命中的日线通常如此）时原样返回，否则 to_numeric(errors="coerce")。"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series, errors="coerce")
+
+
+def offset_days(date: str, n: int) -> str:
+    """YYYYMMDD 日期向前偏移 n 个自然日，不考虑节假日，足够覆盖数据。"""
+    d = dt.datetime.strptime(date, "%Y%m%d")
+    return (d - dt.timedelta(days=n)).strftime("%Y%m%d")
+
+
+# 需要数值化的列（pct_chg 可能带百分号）
+SPOT_NUMERIC_COLS = ("pct_chg", "成交量", "成交额", "volume", "amount")
+HIST_NUMERIC_COLS = ("pct_chg", "volume", "amount", "close", "open", "high", "low", "turnover")
+
+
+def _coerce_numeric(out: pd.DataFrame, numeric_cols: tuple[str, ...]) -> pd.DataFrame:
+    cols = [c for c in numeric_cols if c in out.columns]
+    if cols:
+        out[cols] = out[cols].apply(_to_numeric)
+    return out
 
 
 def clean_spot_df(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-    if "pct_chg" in out.columns:
-        out["pct_chg"] = _to_numeric(out["pct_chg"])  # 百分号转浮点
-    # 成交量/成交额数值化
-    for col in ["成交量", "成交额", "volume", "amount"]:
-        if col in out.columns:
-            out[col] = pd.to_numeric(out[col], errors="coerce")
+    out = _coerce_numeric(df.copy(), SPOT_NUMERIC_COLS)
     out = out.dropna(subset=["代码"]).reset_index(drop=True)
     return out
 
 
 def clean_hist_df(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-    for col in ["pct_chg", "volume", "amount", "close", "open", "high", "low", "turnover"]:
-        if col in out.columns:
-            out[col] = pd.to_numeric(out[col], errors="coerce")
+    out = _coerce_numeric(df.copy(), HIST_NUMERIC_COLS)
     out = out.dropna(subset=["代码"]).reset_index(drop=True)
     return out
 
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+class RateLimiter:
+    """线程安全的请求节流器：保证相邻两次 acquire 之间至少间隔 interval 秒。
+
+    用于替代并发场景下各线程各自 time.sleep 的做法，从而约束对数据源的总请求速率。
+    """
+
+    def __init__(self, interval: float):
+        self.interval = max(0.0, float(interval))
+        self._lock = threading.Lock()
+        self._next_ts = 0.0
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_ts - now
+            self._next_ts = max(now, self._next_ts) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def __enter__(self) -> "RateLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+
+class TokenBucket:
+    """线程安全的令牌桶：按 rate（次/秒）补充令牌，最多积累 capacity 个。
+
+    与 RateLimiter 相比允许短时突发（最多 capacity 次），长期平均速率仍为 rate。
+    rate 为 0 或 inf 时不限速。
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+
+    def set_rate(self, rate: float) -> None:
+        """调整补充速率；已积累的令牌保留。"""
+        with self._cond:
+            self._refill()
+            self.rate = float(rate)
+            self._cond.notify_all()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> None:
+        if self.rate <= 0 or self.rate == float("inf"):  # 不限速
+            return
+        with self._cond:
+            self._refill()
+            while self._tokens < 1.0:
+                self._cond.wait((1.0 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1.0
+
+    def __enter__(self) -> "TokenBucket":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
@@ -1,12 +1,22 @@
+import io
 import json
 import time
 import gzip
 from datetime import datetime, timedelta
 import os
+import threading
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as pa_feather
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选加速依赖
+    orjson = None
 
 from .config import DEFAULT_CONFIG
 from .data_fetch import get_realtime_spot
@@ -20,7 +30,8 @@ REALTIME_DIR = CACHE_DIR / "realtime"
 REALTIME_DIR.mkdir(parents=True, exist_ok=True)
 
 CONFIG_PATH = REALTIME_DIR / "realtime_config.json"
-LATEST_PATH = REALTIME_DIR / "realtime_latest.csv"
+LATEST_PATH = REALTIME_DIR / "realtime_latest.feather"
+LATEST_CSV_PATH = REALTIME_DIR / "realtime_latest.csv"  # 可选的CSV镜像，供外部工具读取
 LOG_DIR = REALTIME_DIR / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 CONTROL_PATH = REALTIME_DIR / "control.json"
@@ -33,13 +44,27 @@ DEFAULT_SERVICE_CONFIG = {
     "poll_interval_sec": 300,  # 5 minutes by default
     "alert_threshold_pct": 3.0,  # percent change threshold
     "retention_days": 7,  # keep logs for N days
+    "mirror_csv": False,  # also write realtime_latest.csv alongside the feather snapshot
 }
 
 
+def _json_dumps(obj: Dict) -> bytes:
+    # 状态/配置/控制文件的JSON编码：有 orjson 时直接产出 UTF-8 bytes
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Dict:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
 def load_config() -> Dict:
     if CONFIG_PATH.exists():
         try:
-            return json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
+            return _json_loads(CONFIG_PATH.read_bytes())
         except Exception:
             pass
     return DEFAULT_SERVICE_CONFIG.copy()
@@ -49,13 +74,13 @@ def save_config(cfg: Dict) -> None:
     # Only persist known keys to avoid junk
     clean = DEFAULT_SERVICE_CONFIG.copy()
     clean.update({k: v for k, v in cfg.items() if k in clean})
-    CONFIG_PATH.write_text(json.dumps(clean, ensure_ascii=False, indent=2), encoding="utf-8")
+    CONFIG_PATH.write_bytes(_json_dumps(clean))
 
 
 def _read_control() -> Dict:
     if CONTROL_PATH.exists():
         try:
-            return json.loads(CONTROL_PATH.read_text(encoding="utf-8"))
+            return _json_loads(CONTROL_PATH.read_bytes())
         except Exception:
             pass
     return {"paused": False, "stop": False}
@@ -64,81 +89,239 @@ def _read_control() -> Dict:
 def _write_control(ctrl: Dict) -> None:
     clean = {"paused": bool(ctrl.get("paused", False)), "stop": bool(ctrl.get("stop", False))}
     tmp = CONTROL_PATH.with_suffix(".tmp")
-    tmp.write_text(json.dumps(clean, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.write_bytes(_json_dumps(clean))
     tmp.replace(CONTROL_PATH)
 
 
+# 控制文件变化时唤醒主循环，使暂停/停止无需等到下一次轮询
+_wake = threading.Event()
+_watcher: threading.Thread | None = None
+
+
+def _control_mtime() -> float | None:
+    try:
+        return CONTROL_PATH.stat().st_mtime
+    except OSError:
+        return None
+
+
+def _watch_control(interval: float = 0.5) -> None:
+    last = _control_mtime()
+    while True:
+        time.sleep(interval)
+        cur = _control_mtime()
+        if cur != last:
+            last = cur
+            _wake.set()
+
+
+def _start_control_watcher() -> None:
+    global _watcher
+    if _watcher is None or not _watcher.is_alive():
+        _watcher = threading.Thread(target=_watch_control, name="control-watcher", daemon=True)
+        _watcher.start()
+
+
+# 交易分钟位图：下标为 HHMM 整数，值为 1 表示该分钟处于交易时段
+_TRADING_MINUTES = bytearray(2400)
+for _hm in range(2400):
+    if 930 <= _hm <= 1130 or 1300 <= _hm <= 1500:
+        _TRADING_MINUTES[_hm] = 1
+del _hm
+
+
 def is_trading_time_now(ts: datetime | None = None) -> bool:
     dt = ts or datetime.now()
     # China A-share trading hours (local time):
     # Weekdays (Mon-Fri): 09:30-11:30, 13:00-15:00
-    if dt.weekday() >= 5:
+    return dt.weekday() < 5 and _TRADING_MINUTES[dt.hour * 100 + dt.minute] == 1
+
+
+def _trading_windows(midnight: datetime) -> Tuple[Tuple[float, float], ...]:
+    """把 _TRADING_MINUTES 中连续的交易分钟合并为当日的 [开始, 结束) 时间戳区间。"""
+    windows = []
+    start = None
+    for minute in range(24 * 60 + 1):
+        on = minute < 24 * 60 and _TRADING_MINUTES[minute // 60 * 100 + minute % 60] == 1
+        if on and start is None:
+            start = minute
+        elif not on and start is not None:
+            windows.append(((midnight + timedelta(minutes=start)).timestamp(), (midnight + timedelta(minutes=minute)).timestamp()))
+            start = None
+    return tuple(windows)
+
+
+def _make_trading_checker() -> Callable[[float], bool]:
+    """构造交易时段判断函数：按日缓存当日交易窗口的时间戳边界，
+    之后每次判断只需比较 time.time() 与几个浮点数，跨日时才重新计算。
+    交易窗口由 _TRADING_MINUTES 分钟表推出，与 is_trading_time_now 共用同一份时段定义。
+    """
+    day_start = 0.0
+    day_end = 0.0
+    windows: Tuple[Tuple[float, float], ...] = ()
+
+    def check(ts: float) -> bool:
+        nonlocal day_start, day_end, windows
+        if not (day_start <= ts < day_end):
+            d = datetime.fromtimestamp(ts)
+            midnight = d.replace(hour=0, minute=0, second=0, microsecond=0)
+            day_start = midnight.timestamp()
+            day_end = (midnight + timedelta(days=1)).timestamp()
+            windows = () if d.weekday() >= 5 else _trading_windows(midnight)
+        for start, end in windows:
+            if start <= ts < end:
+                return True
         return False
-    hm = dt.hour * 100 + dt.minute
-    morning = 930 <= hm <= 1130
-    afternoon = 1300 <= hm <= 1500
-    return morning or afternoon
+
+    return check
+
+
+# 最新价候选列，按优先级排列
+_PRICE_CANDIDATES = ("最新价", "现价", "价格", "close", "收盘", "price")
 
 
 def _extract_price_col(df: pd.DataFrame) -> str | None:
     # Try common columns for latest price
-    candidates = [
-        "最新价", "现价", "价格", "close", "收盘", "price"
-    ]
-    for c in candidates:
-        if c in df.columns:
+    cols = frozenset(df.columns)
+    for c in _PRICE_CANDIDATES:
+        if c in cols:
             return c
     return None
 
 
-def _atomic_write_csv(df: pd.DataFrame, path: Path) -> None:
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    df.to_csv(tmp, index=False, encoding="utf-8")
-    tmp.replace(path)
+class _WriteBatch:
+    """单轮轮询内的文件写出批次。
 
+    各输出先在内存中序列化为 bytes，flush 时每个文件只做一次 os.write：
+    整体替换的文件写入 .tmp 后统一 rename，追加的文件以 O_APPEND 写入。
+    同一路径多次 replace 只保留最后一次内容。
+    """
 
-def _atomic_write_json(obj: Dict, path: Path) -> None:
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
-    tmp.replace(path)
+    def __init__(self) -> None:
+        self._replace: Dict[Path, bytes] = {}
+        self._append: Dict[Path, bytearray] = {}
 
+    def replace(self, path: Path, data: bytes) -> None:
+        self._replace[path] = data
 
-def _append_log(df: pd.DataFrame, now: datetime, retention_days: int) -> None:
-    # Append daily log file and compress previous days if needed
+    def append(self, path: Path, data: bytes) -> None:
+        self._append.setdefault(path, bytearray()).extend(data)
+
+    def has_append(self, path: Path) -> bool:
+        return path in self._append
+
+    @staticmethod
+    def _write_all(path: Path, data: bytes, flags: int) -> None:
+        fd = os.open(path, flags, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    def flush(self) -> None:
+        pending = []
+        for path, data in self._replace.items():
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            self._write_all(tmp, data, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            pending.append((tmp, path))
+        for tmp, path in pending:
+            os.replace(tmp, path)
+        for path, data in self._append.items():
+            self._write_all(path, bytes(data), os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        self._replace.clear()
+        self._append.clear()
+
+
+def _atomic_write_csv(df: pd.DataFrame, path: Path, batch: _WriteBatch | None = None) -> None:
+    data = df.to_csv(index=False).encode("utf-8")
+    if batch is not None:
+        batch.replace(path, data)
+        return
+    one = _WriteBatch()
+    one.replace(path, data)
+    one.flush()
+
+
+def _atomic_write_frame(df: pd.DataFrame, path: Path, batch: _WriteBatch | None = None) -> None:
+    # Feather 保留列类型，读取时无需重新解析与推断
+    buf = io.BytesIO()
+    df.reset_index(drop=True).to_feather(buf, compression="uncompressed")
+    data = buf.getvalue()
+    if batch is not None:
+        batch.replace(path, data)
+        return
+    one = _WriteBatch()
+    one.replace(path, data)
+    one.flush()
+
+
+def _atomic_write_json(obj: Dict, path: Path, batch: _WriteBatch | None = None) -> None:
+    data = _json_dumps(obj)
+    if batch is not None:
+        batch.replace(path, data)
+        return
+    one = _WriteBatch()
+    one.replace(path, data)
+    one.flush()
+
+
+_last_housekeeping_day: str | None = None
+
+
+def _append_log(df: pd.DataFrame, now: datetime, retention_days: int, batch: _WriteBatch | None = None) -> None:
+    _append_log_text(lambda header: df.to_csv(index=False, header=header), now, retention_days, batch)
+
+
+def _append_log_text(render: Callable[[bool], str], now: datetime, retention_days: int, batch: _WriteBatch | None = None) -> None:
+    # 直接追加到当日 gzip 日志（每次追加为一个独立 gzip member，可被 gzip/pandas 连续读取），
+    # 不再次日重读整份 CSV 再压缩；render(header) 返回待追加的 CSV 文本
+    global _last_housekeeping_day
     day = now.strftime("%Y%m%d")
-    log_path = LOG_DIR / f"prices_{day}.csv"
+    log_path = LOG_DIR / f"prices_{day}.csv.gz"
     header = not log_path.exists()
-    df.to_csv(log_path, mode="a", header=header, index=False, encoding="utf-8")
+    if batch is not None:
+        # 同一批次内已有追加内容时不再重复写表头
+        header = header and not batch.has_append(log_path)
+        data = render(header).encode("utf-8")
+        batch.append(log_path, gzip.compress(data, compresslevel=1))
+    else:
+        with gzip.open(log_path, "ab", compresslevel=1) as f:
+            f.write(render(header).encode("utf-8"))
+
+    # 过期日志清理每天只需执行一次，避免每次轮询都遍历日志目录
+    if day != _last_housekeeping_day:
+        _run_housekeeping(now, retention_days)
+        _last_housekeeping_day = day
+
 
-    # Housekeeping: compress older logs and delete beyond retention
+def _run_housekeeping(now: datetime, retention_days: int) -> None:
+    # Cleanup logs older than retention（兼容旧的未压缩 .csv 日志）
     cutoff = now.date() - timedelta(days=retention_days)
-    for p in LOG_DIR.glob("prices_*.csv"):
-        # Compress logs not from today
-        if p.name != log_path.name:
-            gz_path = p.with_suffix(p.suffix + ".gz")
-            if not gz_path.exists():
-                with p.open("rb") as f_in, gzip.open(gz_path, "wb") as f_out:
-                    f_out.write(f_in.read())
-                try:
-                    p.unlink()
-                except Exception:
-                    pass
-    # Cleanup compressed logs older than retention
-    for gz in LOG_DIR.glob("prices_*.csv.gz"):
+    for p in LOG_DIR.glob("prices_*.csv*"):
         try:
-            date_str = gz.stem.split("_")[1]  # prices_YYYYMMDD.csv.gz -> stem: prices_YYYYMMDD.csv
-            date_str = date_str.replace(".csv", "")
+            date_str = p.name[len("prices_"):len("prices_") + 8]
             d = datetime.strptime(date_str, "%Y%m%d").date()
             if d < cutoff:
-                gz.unlink()
+                p.unlink()
         except Exception:
             continue
 
 
-def one_poll(tracked_codes: List[str], alert_threshold_pct: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def _flush_batch(batch: _WriteBatch) -> bool:
+    try:
+        batch.flush()
+        return True
+    except Exception:
+        return False
+
+
+def one_poll(tracked_codes: List[str] | pd.Index, alert_threshold_pct: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Fetch realtime market snapshot, filter tracked codes, compute alerts.
     Returns (latest_snapshot_df, latest_tracked_df).
+    tracked_codes 可传入预先构建的 pd.Index，避免每次轮询重建查找集合。
     """
     spot_df = get_realtime_spot()
     if spot_df is None or len(spot_df) == 0:
@@ -156,81 +339,133 @@ def one_poll(tracked_codes: List[str], alert_threshold_pct: float) -> Tuple[pd.D
             return spot_df, pd.DataFrame()
 
     # Filter to tracked codes
-    tracked_df = spot_df[spot_df["代码"].isin(tracked_codes)].copy()
+    if not isinstance(tracked_codes, pd.Index):
+        tracked_codes = pd.Index(tracked_codes)
+    mask = np.isin(spot_df["代码"].to_numpy(), tracked_codes.to_numpy())
+    # 一次布尔索引同时完成行过滤与列裁剪，得到新的小表后直接追加列，无需额外 copy
+    cols = set(spot_df.columns)
+    keep_cols = [c for c in ("时间", "代码", price_col, "pct_chg", "名称") if c in cols]
+    tracked_df = spot_df.loc[mask, keep_cols].reset_index(drop=True)
     if len(tracked_df) == 0:
         return spot_df, tracked_df
 
     # Calculate alert flag based on pct change
-    if "pct_chg" in tracked_df.columns:
-        tracked_df["alert"] = tracked_df["pct_chg"].abs() >= alert_threshold_pct
+    if "pct_chg" in cols:
+        pct = pd.to_numeric(tracked_df["pct_chg"], errors="coerce").to_numpy(dtype=np.float64)
+        tracked_df["alert"] = np.fabs(pct) >= alert_threshold_pct
     else:
         tracked_df["alert"] = False
-
-    # Keep only relevant columns for snapshot
-    keep_cols = [c for c in ["时间", "代码", price_col, "pct_chg", "名称", "alert"] if c in tracked_df.columns]
-    tracked_df = tracked_df[keep_cols].copy()
     now = datetime.now()
     tracked_df["采集时间"] = now.strftime("%Y-%m-%d %H:%M:%S")
     return spot_df, tracked_df
 
 
+_HEARTBEAT_HEADER = "采集时间,状态\n"
+
+
 def run_service(loop_once: bool = False) -> None:
     cfg = load_config()
     poll_interval = max(30, int(cfg.get("poll_interval_sec", 300)))
     alert_threshold = float(cfg.get("alert_threshold_pct", 3.0))
     tracked_codes: List[str] = list(cfg.get("tracked_codes", []))
+    # 跟踪列表在服务运行期间不变，查找索引只构建一次
+    tracked_index = pd.Index([str(c) for c in tracked_codes], dtype=object)
     retention_days = int(cfg.get("retention_days", 7))
+    mirror_csv = bool(cfg.get("mirror_csv", False))
+
+    def _write_latest(df: pd.DataFrame) -> None:
+        _atomic_write_frame(df, LATEST_PATH, batch)
+        if mirror_csv:
+            _atomic_write_csv(df, LATEST_CSV_PATH, batch)
+
+    def _write_heartbeat(label: str) -> None:
+        # 心跳只有一行两列：直接构造 Arrow 表与 CSV 文本，绕过 DataFrame 与 pandas 的CSV编码器
+        buf = io.BytesIO()
+        pa_feather.write_feather(pa.table({"采集时间": [now_str], "状态": [label]}), buf, compression="uncompressed")
+        batch.replace(LATEST_PATH, buf.getvalue())
+        row = f"{now_str},{label}\n"
+        if mirror_csv:
+            batch.replace(LATEST_CSV_PATH, (_HEARTBEAT_HEADER + row).encode("utf-8"))
+        _append_log_text(lambda header: _HEARTBEAT_HEADER + row if header else row, now, retention_days, batch)
+
+    in_trading = _make_trading_checker()
+    last_status: Dict = {}
+    pending_status: Dict | None = None
+
+    def _write_status(status: Dict) -> None:
+        # 状态未变化时跳过写盘，减少临时文件写入与rename
+        nonlocal pending_status
+        if status == last_status:
+            return
+        _atomic_write_json(status, STATUS_PATH, batch)
+        pending_status = status
+
+    def _mark_flushed() -> None:
+        # 批次落盘成功后才确认状态已写入，失败时下轮会重新写入
+        nonlocal last_status, pending_status
+        if pending_status is not None:
+            last_status = pending_status
+        pending_status = None
+
+    def _flush(batch: _WriteBatch) -> bool:
+        nonlocal pending_status
+        if _flush_batch(batch):
+            _mark_flushed()
+            return True
+        pending_status = None
+        return False
 
     # init status
     start_ts = datetime.now()
+    start_ts_str = start_ts.strftime("%Y-%m-%d %H:%M:%S")
+    pid = os.getpid()
     try:
-        PID_PATH.write_text(str(os.getpid()), encoding="utf-8")
+        PID_PATH.write_text(str(pid), encoding="utf-8")
     except Exception:
         pass
     error_count = 0
-    _atomic_write_json({
-        "running": True,
-        "pid": os.getpid(),
-        "start_time": start_ts.strftime("%Y-%m-%d %H:%M:%S"),
-        "last_poll_time": None,
-        "progress_pct": 0.0,
-        "error_count": 0,
-        "trading": is_trading_time_now(start_ts),
-        "paused": False,
-        "stop_requested": False,
-    }, STATUS_PATH)
-
+    trading_flag = in_trading(start_ts.timestamp())
+
+    def _snap(**over) -> Dict:
+        # 状态快照：公共字段取当前的错误计数与交易标记，仅覆盖各分支不同的字段
+        status = {
+            "running": True,
+            "pid": pid,
+            "start_time": start_ts_str,
+            "last_poll_time": None,
+            "progress_pct": 0.0,
+            "error_count": error_count,
+            "trading": trading_flag,
+            "paused": False,
+            "stop_requested": False,
+        }
+        status.update(over)
+        return status
+
+    batch = _WriteBatch()
+    _write_status(_snap())
+    batch.flush()
+    _mark_flushed()
+
+    _start_control_watcher()
     while True:
+        # 本轮所有输出先写入内存批次，轮末统一落盘
+        batch = _WriteBatch()
         now = datetime.now()
+        now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+        # 先清除唤醒标记再读取控制文件，之后的任何变更都会打断本轮等待
+        _wake.clear()
         ctrl = _read_control()
-        trading_flag = is_trading_time_now(now)
+        trading_flag = in_trading(now.timestamp())
         if ctrl.get("stop", False):
-            _atomic_write_json({
-                "running": False,
-                "pid": os.getpid(),
-                "start_time": start_ts.strftime("%Y-%m-%d %H:%M:%S"),
-                "last_poll_time": None,
-                "progress_pct": 0.0,
-                "error_count": error_count,
-                "trading": trading_flag,
-                "paused": ctrl.get("paused", False),
-                "stop_requested": True,
-            }, STATUS_PATH)
+            _write_status(_snap(running=False, paused=ctrl.get("paused", False), stop_requested=True))
+            _flush(batch)
             break
 
         if ctrl.get("paused", False):
-            _atomic_write_json({
-                "running": True,
-                "pid": os.getpid(),
-                "start_time": start_ts.strftime("%Y-%m-%d %H:%M:%S"),
-                "last_poll_time": None,
-                "progress_pct": 0.0,
-                "error_count": error_count,
-                "trading": trading_flag,
-                "paused": True,
-                "stop_requested": False,
-            }, STATUS_PATH)
-            time.sleep(2)
+            _write_status(_snap(paused=True))
+            _flush(batch)
+            _wake.wait(timeout=poll_interval)
             if loop_once:
                 break
             continue
@@ -238,101 +473,48 @@ def run_service(loop_once: bool = False) -> None:
         if trading_flag:
             if tracked_codes:
                 try:
-                    spot_df, tracked_df = one_poll(tracked_codes, alert_threshold)
+                    spot_df, tracked_df = one_poll(tracked_index, alert_threshold)
                     if len(tracked_df) > 0:
-                        _atomic_write_csv(tracked_df, LATEST_PATH)
-                        _append_log(tracked_df, now, retention_days)
+                        _write_latest(tracked_df)
+                        _append_log(tracked_df, now, retention_days, batch)
                     else:
                         # 在交易时段但未产生数据（例如所选股票不在快照中），写入心跳并记录日志
-                        hb = pd.DataFrame({
-                            "采集时间": [now.strftime("%Y-%m-%d %H:%M:%S")],
-                            "状态": ["数据不可用"],
-                        })
                         try:
-                            _atomic_write_csv(hb, LATEST_PATH)
-                            _append_log(hb, now, retention_days)
+                            _write_heartbeat("数据不可用")
                         except Exception:
                             pass
-                    _atomic_write_json({
-                        "running": True,
-                        "pid": os.getpid(),
-                        "start_time": start_ts.strftime("%Y-%m-%d %H:%M:%S"),
-                        "last_poll_time": now.strftime("%Y-%m-%d %H:%M:%S"),
-                        "progress_pct": 0.0,
-                        "error_count": error_count,
-                        "trading": trading_flag,
-                        "paused": False,
-                        "stop_requested": False,
-                    }, STATUS_PATH)
+                    _write_status(_snap(last_poll_time=now_str))
                 except Exception:
                     # Avoid crashing service on transient errors
                     error_count += 1
                     time.sleep(5)
             else:
                 # 在交易时段但未选择股票，写入心跳并记录日志，避免误显示为“非交易时段”
-                hb = pd.DataFrame({
-                    "采集时间": [now.strftime("%Y-%m-%d %H:%M:%S")],
-                    "状态": ["未选择股票"],
-                })
                 try:
-                    _atomic_write_csv(hb, LATEST_PATH)
-                    _append_log(hb, now, retention_days)
+                    _write_heartbeat("未选择股票")
                 except Exception:
                     pass
-                _atomic_write_json({
-                    "running": True,
-                    "pid": os.getpid(),
-                    "start_time": start_ts.strftime("%Y-%m-%d %H:%M:%S"),
-                    "last_poll_time": None,
-                    "progress_pct": 0.0,
-                    "error_count": error_count,
-                    "trading": trading_flag,
-                    "paused": False,
-                    "stop_requested": False,
-                }, STATUS_PATH)
+                _write_status(_snap())
         else:
             # 非交易时段，写入心跳并记录日志
-            hb = pd.DataFrame({
-                "采集时间": [now.strftime("%Y-%m-%d %H:%M:%S")],
-                "状态": ["非交易时段"],
-            })
             try:
-                _atomic_write_csv(hb, LATEST_PATH)
-                _append_log(hb, now, retention_days)
+                _write_heartbeat("非交易时段")
             except Exception:
                 pass
-            _atomic_write_json({
-                "running": True,
-                "pid": os.getpid(),
-                "start_time": start_ts.strftime("%Y-%m-%d %H:%M:%S"),
-                "last_poll_time": None,
-                "progress_pct": 0.0,
-                "error_count": error_count,
-                "trading": trading_flag,
-                "paused": False,
-                "stop_requested": False,
-            }, STATUS_PATH)
+            _write_status(_snap())
 
         if loop_once:
+            _flush(batch)
             break
-        # update progress (elapsed over interval)
-        elapsed = (datetime.now() - now).total_seconds()
-        pct = max(0.0, min(100.0, (elapsed / poll_interval) * 100.0))
-        try:
-            cur = json.loads(STATUS_PATH.read_text(encoding="utf-8"))
-        except Exception:
-            cur = {}
-        cur.update({
-            "progress_pct": pct,
-        })
-        _atomic_write_json(cur, STATUS_PATH)
-        time.sleep(poll_interval)
+        if not _flush(batch):
+            error_count += 1
+        _wake.wait(timeout=poll_interval)
 
 
 def read_latest_snapshot() -> pd.DataFrame:
     if LATEST_PATH.exists():
         try:
-            return pd.read_csv(LATEST_PATH)
+            return pd.read_feather(LATEST_PATH)
         except Exception:
             return pd.DataFrame()
     return pd.DataFrame()
@@ -341,7 +523,7 @@ def read_latest_snapshot() -> pd.DataFrame:
 def read_service_status() -> Dict:
     if STATUS_PATH.exists():
         try:
-            return json.loads(STATUS_PATH.read_text(encoding="utf-8"))
+            return _json_loads(STATUS_PATH.read_bytes())
         except Exception:
             return {}
     return {}
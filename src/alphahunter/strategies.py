@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Callable, Dict, Tuple
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -10,27 +11,30 @@ try:
 except Exception as e:  # pragma: no cover
     raise RuntimeError("akshare 未安装或导入失败，请先安装 akshare") from e
 
-from .cache import cacheable_df
-from .config import DEFAULT_CONFIG
-from .filters import compute_rsi, compute_macd, _offset_days
-from .data_fetch import get_symbol_hist_range
+from .cache import cacheable_df, ttl_cache
+from .config import Config, DEFAULT_CONFIG
+from .filters import compute_rsi_macd_last
+from .processing import ensure_numeric, offset_days
+# 本模块的 akshare 请求与 data_fetch 共用同一个令牌桶，约束所有线程的总请求速率
+from .data_fetch import AKSHARE_LIMITER, get_symbol_hist_range
 
 
 def _ensure_code_col(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-    if "代码" not in out.columns:
-        for col in ["code", "股票代码", "证券代码"]:
-            if col in out.columns:
-                out.rename(columns={col: "代码"}, inplace=True)
-                break
-    return out
+    # 已有 代码 列（akshare 的常见情况）时原样返回，不复制整表
+    if "代码" in df.columns:
+        return df
+    for col in ("code", "股票代码", "证券代码"):
+        if col in df.columns:
+            return df.rename(columns={col: "代码"})
+    return df
 
 
 @cacheable_df(lambda date: f"strong_direct_{date}")
 def get_strong_stocks_direct(date: str, use_cache: bool = True) -> pd.DataFrame:
     """直接获取强势股榜单：使用涨停股池作为强势来源。"""
     try:
-        df = ak.stock_zt_pool_em(date=date)
+        with AKSHARE_LIMITER:
+            df = ak.stock_zt_pool_em(date=date)
         df = _ensure_code_col(df)
         # 常见列：代码、名称、涨停原因类别、所属行业、连板数、成交额、涨跌幅等
         pick_cols = [c for c in ["代码", "名称", "涨跌幅", "连板数", "所属行业", "涨停时间"] if c in df.columns]
@@ -39,25 +43,33 @@ def get_strong_stocks_direct(date: str, use_cache: bool = True) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@cacheable_df(lambda date: f"strong_hot_{date}")
+@ttl_cache(60)
+def _fetch_hot_rank() -> pd.DataFrame:
+    with AKSHARE_LIMITER:
+        df = ak.stock_hot_rank_em()
+    return _ensure_code_col(df)
+
+
+@ttl_cache(60)
+def _fetch_hot_up() -> pd.DataFrame:
+    with AKSHARE_LIMITER:
+        df = ak.stock_hot_up_em()
+    return _ensure_code_col(df)
+
+
 def get_strong_stocks_hot(date: str, use_cache: bool = True) -> pd.DataFrame:
     """人气榜作为冗余现成榜单来源。
 
     优先使用东方财富个股人气榜与飙升榜；部分接口为最新榜单，不严格按历史日期。
+    人气榜为实时榜单，不落磁盘缓存，只由两个接口的 60 秒 TTL 缓存复用；
+    date/use_cache 仅为与其他榜单来源保持同一调用签名。
     """
     frames: List[pd.DataFrame] = []
-    try:
-        hot_rank = ak.stock_hot_rank_em()
-        hot_rank = _ensure_code_col(hot_rank)
-        frames.append(hot_rank)
-    except Exception:
-        pass
-    try:
-        hot_up = ak.stock_hot_up_em()
-        hot_up = _ensure_code_col(hot_up)
-        frames.append(hot_up)
-    except Exception:
-        pass
+    for fetch in (_fetch_hot_rank, _fetch_hot_up):
+        try:
+            frames.append(fetch())
+        except Exception:
+            pass
     if not frames:
         return pd.DataFrame()
     df = pd.concat(frames, ignore_index=True)
@@ -71,7 +83,8 @@ def get_strong_stocks_hot(date: str, use_cache: bool = True) -> pd.DataFrame:
 def get_strong_stocks_billboard(date: str, use_cache: bool = True) -> pd.DataFrame:
     """获取指定日期龙虎榜个股。"""
     try:
-        df = ak.stock_lhb_detail_em(start_date=date, end_date=date)
+        with AKSHARE_LIMITER:
+            df = ak.stock_lhb_detail_em(start_date=date, end_date=date)
         df = _ensure_code_col(df)
         pick_cols = [c for c in ["代码", "名称", "涨跌幅", "上榜原因", "买入额", "卖出额"] if c in df.columns]
         out = df[pick_cols] if pick_cols else df
@@ -81,12 +94,30 @@ def get_strong_stocks_billboard(date: str, use_cache: bool = True) -> pd.DataFra
         return pd.DataFrame()
 
 
+def _fetch_board(board_name: str, candidates_per_board: int) -> Optional[pd.DataFrame]:
+    """拉取单个行业板块的成分股候选，失败返回 None。"""
+    try:
+        with AKSHARE_LIMITER:
+            cons = ak.stock_board_industry_cons_em(symbol=board_name)
+        cons = _ensure_code_col(cons)
+        # 取少量成分股作为候选，减少API调用和后续处理压力
+        pick_cols = [c for c in ["代码", "名称", "板块", "最新价", "涨跌幅"] if c in cons.columns]
+        cons = cons[pick_cols] if pick_cols else cons
+        cons = cons.head(candidates_per_board).copy()
+        cons["来源板块"] = board_name
+        return cons
+    except Exception:
+        # 某些板块拉取失败时跳过
+        return None
+
+
 @cacheable_df(lambda date, top_boards=5, **_: f"strong_sector_{date}_{top_boards}")
 def get_strong_stocks_via_sector(date: str, top_boards: int = 5, candidates_per_board: int = 20, use_cache: bool = True) -> pd.DataFrame:
     """通过板块轮动补充强势股：选取当日涨幅居前的行业板块，并从其成分股中挑选候选。"""
     try:
         # 获取行业板块当日表现
-        boards = ak.stock_board_industry_name_em()
+        with AKSHARE_LIMITER:
+            boards = ak.stock_board_industry_name_em()
         if boards is None or boards.empty:
             return pd.DataFrame()
         # 统一涨幅列名
@@ -96,26 +127,14 @@ def get_strong_stocks_via_sector(date: str, top_boards: int = 5, candidates_per_
         boards["涨跌幅"] = pd.to_numeric(boards["涨跌幅"], errors="coerce")
         boards = boards.sort_values(by="涨跌幅", ascending=False).head(top_boards)
 
-        records: List[pd.DataFrame] = []
-        for _, row in boards.iterrows():
-            name_col = "板块名称" if "板块名称" in boards.columns else ("行业名称" if "行业名称" in boards.columns else None)
-            if not name_col:
-                continue
-            board_name = str(row[name_col])
-            try:
-                cons = ak.stock_board_industry_cons_em(symbol=board_name)
-                cons = _ensure_code_col(cons)
-                # 取少量成分股作为候选，减少API调用和后续处理压力
-                pick_cols = [c for c in ["代码", "名称", "板块", "最新价", "涨跌幅"] if c in cons.columns]
-                cons = cons[pick_cols] if pick_cols else cons
-                cons = cons.head(candidates_per_board)
-                cons["来源板块"] = board_name
-                records.append(cons)
-            except Exception:
-                # 某些板块拉取失败时跳过
-                pass
-            finally:
-                time.sleep(DEFAULT_CONFIG.per_request_sleep_sec)
+        name_col = "板块名称" if "板块名称" in boards.columns else ("行业名称" if "行业名称" in boards.columns else None)
+        if not name_col:
+            return pd.DataFrame()
+        board_names = boards[name_col].astype(str).tolist()
+        workers = max(1, min(len(board_names), 4))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda name: _fetch_board(name, candidates_per_board), board_names)
+            records = [r for r in results if r is not None]
 
         if not records:
             return pd.DataFrame()
@@ -128,39 +147,40 @@ def get_strong_stocks_via_sector(date: str, top_boards: int = 5, candidates_per_
         return pd.DataFrame()
 
 
-def get_strong_stocks_comprehensive(target_date: str) -> pd.DataFrame:
+def _fetch_primary_sources(target_date: str) -> List[Tuple[str, pd.DataFrame]]:
+    """并发获取涨停股池、人气榜与龙虎榜，按 direct/hot/lhb 顺序返回 (名称, 结果)。"""
+    sources = (
+        ("direct", get_strong_stocks_direct),
+        ("hot", get_strong_stocks_hot),
+        ("lhb", get_strong_stocks_billboard),
+    )
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        futures = [(name, executor.submit(func, target_date, use_cache=True)) for name, func in sources]
+        return [(name, fut.result()) for name, fut in futures]
+
+
+def get_strong_stocks_comprehensive(target_date: str, cfg: Optional[Config] = None) -> pd.DataFrame:
     """综合多种高效方法获取强势股。包含API调用保护与缓存。
 
     步骤：
     1) 直接获取现成榜单（涨停股池）
     2) 获取龙虎榜股票
     3) 若不足，则通过板块轮动补充
+
+    cfg 为本次调用的配置，缺省使用 DEFAULT_CONFIG（不会修改全局配置）。
     """
+    cfg = cfg or DEFAULT_CONFIG
     all_strong: List[pd.DataFrame] = []
 
     print("=== 开始获取强势股 ===")
 
-    # 1. 现成榜单
+    # 1. 现成榜单 / 1b. 人气榜冗余来源 / 2. 龙虎榜：三者互不依赖，并发获取
     print("1. 获取现成强势股榜单...")
-    direct_df = get_strong_stocks_direct(target_date, use_cache=True)
-    if direct_df is not None and not direct_df.empty:
-        all_strong.append(direct_df)
-
-    time.sleep(DEFAULT_CONFIG.per_request_sleep_sec)
-
-    # 1b. 人气榜冗余来源
     print("1b. 获取人气榜股票...")
-    hot_df = get_strong_stocks_hot(target_date, use_cache=True)
-    if hot_df is not None and not hot_df.empty:
-        all_strong.append(hot_df)
-
-    # 2. 龙虎榜
     print("2. 获取龙虎榜股票...")
-    lhb_df = get_strong_stocks_billboard(target_date, use_cache=True)
-    if lhb_df is not None and not lhb_df.empty:
-        all_strong.append(lhb_df)
-
-    time.sleep(DEFAULT_CONFIG.per_request_sleep_sec)
+    for _, df in _fetch_primary_sources(target_date):
+        if df is not None and not df.empty:
+            all_strong.append(df)
 
     # 3. 板块轮动补充
     combined_count = sum(len(df) for df in all_strong)
@@ -177,9 +197,9 @@ def get_strong_stocks_comprehensive(target_date: str) -> pd.DataFrame:
         if "代码" in final.columns:
             final = final.drop_duplicates(subset=["代码"], keep="first")
         # 指标过滤辅助（可配置）
-        if DEFAULT_CONFIG.enable_indicator_filter and "代码" in final.columns:
+        if cfg.enable_indicator_filter and "代码" in final.columns:
             print("4. 指标过滤辅助 (RSI / MACD)…")
-            final = _apply_indicator_filter(final, target_date)
+            final = _apply_indicator_filter(final, target_date, cfg)
         print(f"=== 最终找到 {len(final)} 只强势股 ===")
         return final
     else:
@@ -187,44 +207,27 @@ def get_strong_stocks_comprehensive(target_date: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def get_strong_stocks_comprehensive_with_stats(target_date: str, progress_cb: Optional[Callable[[int, str], None]] = None) -> Tuple[pd.DataFrame, Dict[str, int]]:
+def get_strong_stocks_comprehensive_with_stats(target_date: str, progress_cb: Optional[Callable[[int, str], None]] = None, cfg: Optional[Config] = None) -> Tuple[pd.DataFrame, Dict[str, int]]:
     """与 get_strong_stocks_comprehensive 等价，但返回统计信息并支持进度回调。
 
     progress_cb 接收两个参数：step_index（从 1 开始）与 step_label。
     统计信息包含各阶段候选数量与最终数量：
       - direct_count, hot_count, lhb_count, sector_count, final_count
     若启用指标过滤，则还包含 filtered_count（过滤后数量）。
+    cfg 为本次调用的配置，缺省使用 DEFAULT_CONFIG。
     """
+    cfg = cfg or DEFAULT_CONFIG
     stats: Dict[str, int] = {"direct_count": 0, "hot_count": 0, "lhb_count": 0, "sector_count": 0, "final_count": 0}
     all_strong: List[pd.DataFrame] = []
 
-    # 1. 现成榜单
-    if progress_cb:
-        progress_cb(1, "获取现成强势股榜单")
-    direct_df = get_strong_stocks_direct(target_date, use_cache=True)
-    if direct_df is not None and not direct_df.empty:
-        stats["direct_count"] = len(direct_df)
-        all_strong.append(direct_df)
-
-    time.sleep(DEFAULT_CONFIG.per_request_sleep_sec)
-
-    # 1b. 人气榜
-    if progress_cb:
-        progress_cb(2, "获取人气榜股票")
-    hot_df = get_strong_stocks_hot(target_date, use_cache=True)
-    if hot_df is not None and not hot_df.empty:
-        stats["hot_count"] = len(hot_df)
-        all_strong.append(hot_df)
-
-    # 2. 龙虎榜
-    if progress_cb:
-        progress_cb(3, "获取龙虎榜股票")
-    lhb_df = get_strong_stocks_billboard(target_date, use_cache=True)
-    if lhb_df is not None and not lhb_df.empty:
-        stats["lhb_count"] = len(lhb_df)
-        all_strong.append(lhb_df)
-
-    time.sleep(DEFAULT_CONFIG.per_request_sleep_sec)
+    # 1. 现成榜单 / 1b. 人气榜 / 2. 龙虎榜：并发获取，进度按顺序在当前线程回调
+    steps = {"direct": (1, "获取现成强势股榜单"), "hot": (2, "获取人气榜股票"), "lhb": (3, "获取龙虎榜股票")}
+    for name, df in _fetch_primary_sources(target_date):
+        if progress_cb:
+            progress_cb(*steps[name])
+        if df is not None and not df.empty:
+            stats[f"{name}_count"] = len(df)
+            all_strong.append(df)
 
     # 3. 板块轮动补充
     combined_count = sum(len(df) for df in all_strong)
@@ -245,10 +248,10 @@ def get_strong_stocks_comprehensive_with_stats(target_date: str, progress_cb: Op
         stats["final_count"] = len(final)
 
         # 指标过滤辅助（可配置）
-        if DEFAULT_CONFIG.enable_indicator_filter and "代码" in final.columns:
+        if cfg.enable_indicator_filter and "代码" in final.columns:
             if progress_cb:
                 progress_cb(5, "指标过滤 (RSI/MACD)")
-            filtered = _apply_indicator_filter(final, target_date)
+            filtered = _apply_indicator_filter(final, target_date, cfg)
             stats["filtered_count"] = len(filtered)
             return filtered, stats
         else:
@@ -261,43 +264,49 @@ def get_strong_stocks_comprehensive_with_stats(target_date: str, progress_cb: Op
         return pd.DataFrame(), stats
 
 
-def _apply_indicator_filter(df: pd.DataFrame, date: str) -> pd.DataFrame:
+def _apply_indicator_filter(df: pd.DataFrame, date: str, cfg: Config = DEFAULT_CONFIG) -> pd.DataFrame:
     """在合并结果上应用轻量指标过滤：RSI>=阈值且MACD柱体>=阈值。
 
     为保护API调用：
     - 仅对前 max_symbols_indicator_check 只股票计算指标；
     - 使用缓存与节流；
     """
-    limit = min(len(df), DEFAULT_CONFIG.max_symbols_indicator_check)
+    limit = min(len(df), cfg.max_symbols_indicator_check)
     subset = df.head(limit).copy()
-    rsi_vals: List[Optional[float]] = []
-    macd_hist_vals: List[Optional[float]] = []
+    start = offset_days(date, cfg.indicator_lookback_days)
 
-    for code in subset["代码"].astype(str).tolist():
-        start = _offset_days(date, DEFAULT_CONFIG.indicator_lookback_days)
+    def _compute_one(code: str) -> Tuple[Optional[float], Optional[float]]:
+        # 节流在 get_symbol_hist_range 实际发起网络请求时进行，缓存命中不占用令牌
         hist = get_symbol_hist_range(code, start_date=start, end_date=date, use_cache=True)
         if hist is None or hist.empty or "close" not in hist.columns:
-            rsi_vals.append(None)
-            macd_hist_vals.append(None)
-            time.sleep(DEFAULT_CONFIG.per_request_sleep_sec)
-            continue
-        close = pd.to_numeric(hist["close"], errors="coerce")
-        rsi_series = compute_rsi(close, window=DEFAULT_CONFIG.rsi_window)
-        macd_df = compute_macd(close, fast=DEFAULT_CONFIG.macd_fast, slow=DEFAULT_CONFIG.macd_slow, signal=DEFAULT_CONFIG.macd_signal)
-        rsi_vals.append(float(rsi_series.iloc[-1]) if not rsi_series.empty else None)
-        macd_hist_vals.append(float(macd_df["hist"].iloc[-1]) if not macd_df.empty else None)
-        time.sleep(DEFAULT_CONFIG.per_request_sleep_sec)
-
-    subset["rsi"] = rsi_vals
-    subset["macd_hist"] = macd_hist_vals
+            return None, None
+        close = ensure_numeric(hist["close"])
+        return compute_rsi_macd_last(
+            close,
+            window=cfg.rsi_window,
+            fast=cfg.macd_fast,
+            slow=cfg.macd_slow,
+            signal=cfg.macd_signal,
+        )
+
+    codes = subset["代码"].astype(str).tolist()
+    workers = max(1, min(cfg.fetch_max_workers, len(codes)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_compute_one, codes))
+
+    # 结果直接转为 float64 二维数组（None 记为 NaN），按列写入，不经过 Python 列表拆分
+    values = np.array(results, dtype=np.float64).reshape(-1, 2)
+    subset["rsi"] = values[:, 0]
+    subset["macd_hist"] = values[:, 1]
     # 过滤条件
-    rsi_min = DEFAULT_CONFIG.indicator_rsi_min
-    macd_min = DEFAULT_CONFIG.indicator_macd_hist_min
+    rsi_min = cfg.indicator_rsi_min
+    macd_min = cfg.indicator_macd_hist_min
     filtered = subset[(subset["rsi"] >= rsi_min) & (subset["macd_hist"] >= macd_min)]
-    # 将过滤结果与原始df按代码左连接合并，保留符合的股票
+    # 按代码查表附加指标列（可选展示），未通过过滤的股票指标为空，随后剔除
     if "代码" in df.columns:
-        keep_codes = set(filtered["代码"].astype(str).tolist())
-        df = df[df["代码"].astype(str).isin(keep_codes)].copy().reset_index(drop=True)
-        # 附加指标列（可选展示）
-        df = df.merge(filtered[["代码", "rsi", "macd_hist"]], on="代码", how="left")
+        keep = filtered.set_index(filtered["代码"].astype(str))[["rsi", "macd_hist"]]
+        keep = keep[~keep.index.duplicated()]
+        code_str = df["代码"].astype(str)
+        df = df.assign(rsi=code_str.map(keep["rsi"]), macd_hist=code_str.map(keep["macd_hist"]))
+        df = df[df["rsi"].notna()].reset_index(drop=True)
     return df
\ No newline at end of file
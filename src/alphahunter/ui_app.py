@@ -1,6 +1,14 @@
 from __future__ import annotations
 
+import atexit
+import dataclasses
 import datetime as dt
+import gzip
+import io
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 import pandas as pd
@@ -12,11 +20,13 @@ import sys
 
 # 将项目 src 目录加入 sys.path，便于绝对导入
 ROOT = Path(__file__).resolve().parents[2]
-sys.path.append(str(ROOT / "src"))
+# Streamlit 每次重跑都会重新执行本脚本，避免重复追加同一路径
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
 
-from alphahunter.config import DEFAULT_CONFIG
-from alphahunter.strategies import get_strong_stocks_comprehensive, get_strong_stocks_comprehensive_with_stats
-from alphahunter.data_fetch import get_symbol_hist_range, get_realtime_spot
+from alphahunter.cache import cache as df_cache
+from alphahunter.config import Config, DEFAULT_CONFIG
+from alphahunter.data_fetch import get_symbol_hist_range, get_realtime_spot, set_request_interval
 from alphahunter.realtime_service import (
     save_config as rt_save_config,
     load_config as rt_load_config,
@@ -25,12 +35,17 @@ from alphahunter.realtime_service import (
     read_service_status,
     set_service_control,
 )
-from alphahunter.filters import compute_rsi, compute_macd
-from alphahunter.processing import clean_spot_df
+from alphahunter.filters import compute_rsi_macd_batch
+from alphahunter.processing import clean_spot_df, ensure_numeric
 import subprocess
 import os
 import json
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选加速依赖
+    orjson = None
+
 
 st.set_page_config(page_title="AlphaHunter 强势股跟踪", layout="wide")
 
@@ -56,9 +71,11 @@ max_check = st.sidebar.slider("指标检查股票数上限", 10, 200, int(DEFAUL
 
 st.sidebar.markdown("### 价格跟踪设置")
 track_days = st.sidebar.slider("跟踪区间天数", 30, 180, 90)
+fetch_workers = st.sidebar.slider("历史拉取并发数", 1, 16, int(DEFAULT_CONFIG.fetch_max_workers), help="并发越高越快，但更容易触发数据源限流")
 sleep_seconds = st.sidebar.number_input("每请求休眠秒数", value=float(DEFAULT_CONFIG.per_request_sleep_sec), min_value=0.0, step=0.1)
 
 run_btn = st.sidebar.button("运行筛选")
+clear_cache_btn = st.sidebar.button("清除数据缓存", help="删除磁盘上的行情/历史缓存并清空页面缓存，下次访问将重新拉取")
 
 # 会话状态：持久化筛选结果与选中代码，避免交互导致页面重载后丢失
 if "result_df" not in st.session_state:
@@ -75,25 +92,104 @@ try:
 except Exception:
     pass
 
-LAST_RESULT_PATH = UI_CACHE_DIR / "last_result.csv"
+LAST_RESULT_PATH = UI_CACHE_DIR / "last_result.feather"
+LEGACY_RESULT_PATH = UI_CACHE_DIR / "last_result.csv"  # 旧版本/回退格式
 LAST_STATS_PATH = UI_CACHE_DIR / "last_stats.json"
 SELECTED_CODES_PATH = UI_CACHE_DIR / "selected_codes.json"
 LAST_DATE_PATH = UI_CACHE_DIR / "last_date.txt"
 
-def _save_ui_state(result_df: pd.DataFrame | None, stats: dict | None, selected_codes: List[str] | None, date_str: str | None):
+def _dump_json(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _load_json(path: Path):
+    data = path.read_bytes()
+    return orjson.loads(data) if orjson is not None else json.loads(data.decode("utf-8"))
+
+
+def _save_result_df(result_df: pd.DataFrame) -> None:
+    # Feather 保留列类型（代码不丢前导零），读写远快于CSV；含混合类型列无法写 Feather 时回退CSV
+    try:
+        result_df.reset_index(drop=True).to_feather(LAST_RESULT_PATH)
+        LEGACY_RESULT_PATH.unlink(missing_ok=True)
+    except Exception:
+        LAST_RESULT_PATH.unlink(missing_ok=True)
+        result_df.to_csv(LEGACY_RESULT_PATH, index=False, encoding="utf-8-sig")
+
+
+def _save_ui_state(result_df: pd.DataFrame | None, stats: dict | None, selected_codes: List[str] | None, date_str: str | None, written: dict, result_version: int | None = None):
+    # written 记录各文件最近一次写入的内容（结果表只记录版本号），未变化时跳过写盘
     try:
         if result_df is not None and not result_df.empty:
-            result_df.to_csv(LAST_RESULT_PATH, index=False, encoding="utf-8-sig")
-        if isinstance(stats, dict):
-            LAST_STATS_PATH.write_text(json.dumps(stats, ensure_ascii=False), encoding="utf-8")
+            if result_version is None or result_version != written.get("result_ver"):
+                _save_result_df(result_df)
+                written["result_ver"] = result_version
+        if isinstance(stats, dict) and stats != written.get("stats"):
+            LAST_STATS_PATH.write_bytes(_dump_json(stats))
+            written["stats"] = dict(stats)
         if selected_codes is not None:
-            SELECTED_CODES_PATH.write_text(json.dumps(list(selected_codes), ensure_ascii=False), encoding="utf-8")
-        if date_str:
+            codes = list(selected_codes)
+            if codes != written.get("codes"):
+                SELECTED_CODES_PATH.write_bytes(_dump_json(codes))
+                written["codes"] = codes
+        if date_str and date_str != written.get("date"):
             LAST_DATE_PATH.write_text(str(date_str), encoding="utf-8")
+            written["date"] = date_str
     except Exception:
         # 静默失败，不影响页面展示
         pass
 
+class _DebouncedStateWriter:
+    """合并短时间内的多次状态保存：页面渲染只登记待写内容，
+    静默 delay 秒后由后台线程统一写盘，进程退出前补写一次。"""
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self.written: dict = {}
+        self._pending: dict = {}
+        self._dirty_at: float | None = None
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="ui-state-writer", daemon=True).start()
+        atexit.register(self.flush)
+
+    def mark_dirty(self, **state) -> None:
+        with self._lock:
+            self._pending.update({k: v for k, v in state.items() if v is not None})
+            self._dirty_at = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.delay / 2)
+            with self._lock:
+                ready = self._dirty_at is not None and time.monotonic() - self._dirty_at >= self.delay
+            if ready:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending, self._dirty_at = self._pending, {}, None
+        if pending:
+            _save_ui_state(
+                pending.get("result_df"),
+                pending.get("stats"),
+                pending.get("selected_codes"),
+                pending.get("date_str"),
+                self.written,
+                pending.get("result_version"),
+            )
+
+
+@st.cache_resource
+def _state_writer() -> _DebouncedStateWriter:
+    return _DebouncedStateWriter()
+
+
+def _mark_dirty(**state) -> None:
+    _state_writer().mark_dirty(**state)
+
+
 def _load_ui_state():
     res_df = pd.DataFrame()
     stats_obj = None
@@ -101,11 +197,13 @@ def _load_ui_state():
     date_str = None
     try:
         if LAST_RESULT_PATH.exists():
-            res_df = pd.read_csv(LAST_RESULT_PATH)
+            res_df = pd.read_feather(LAST_RESULT_PATH)
+        elif LEGACY_RESULT_PATH.exists():
+            res_df = pd.read_csv(LEGACY_RESULT_PATH, dtype={"代码": str})
         if LAST_STATS_PATH.exists():
-            stats_obj = json.loads(LAST_STATS_PATH.read_text(encoding="utf-8"))
+            stats_obj = _load_json(LAST_STATS_PATH)
         if SELECTED_CODES_PATH.exists():
-            codes = json.loads(SELECTED_CODES_PATH.read_text(encoding="utf-8"))
+            codes = _load_json(SELECTED_CODES_PATH)
         if LAST_DATE_PATH.exists():
             date_str = LAST_DATE_PATH.read_text(encoding="utf-8").strip()
     except Exception:
@@ -113,35 +211,150 @@ def _load_ui_state():
     return res_df, stats_obj, codes, date_str
 
 
-def apply_indicator_config():
-    DEFAULT_CONFIG.enable_indicator_filter = enable_ind
-    DEFAULT_CONFIG.indicator_rsi_min = float(rsi_min)
-    DEFAULT_CONFIG.indicator_macd_hist_min = float(macd_hist_min)
-    DEFAULT_CONFIG.indicator_lookback_days = int(lookback_days)
-    DEFAULT_CONFIG.max_symbols_indicator_check = int(max_check)
-    DEFAULT_CONFIG.per_request_sleep_sec = float(sleep_seconds)
+def build_indicator_config() -> Config:
+    """由侧边栏参数生成本次筛选的配置副本；不修改全局 DEFAULT_CONFIG，避免多会话互相影响。"""
+    return dataclasses.replace(
+        DEFAULT_CONFIG,
+        enable_indicator_filter=bool(enable_ind),
+        indicator_rsi_min=float(rsi_min),
+        indicator_macd_hist_min=float(macd_hist_min),
+        indicator_lookback_days=int(lookback_days),
+        max_symbols_indicator_check=int(max_check),
+        per_request_sleep_sec=float(sleep_seconds),
+        fetch_max_workers=int(fetch_workers),
+    )
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_hist(code: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """按 (代码, 起止日期) 缓存区间日线，避免每次页面重跑都重新拉取/反序列化。"""
+    # 磁盘缓存按 (代码, 起止日期) 持久化；截止日为今天的区间由 data_fetch 按文件 mtime 判定新鲜度
+    hist = get_symbol_hist_range(code, start_date=start_date, end_date=end_date, use_cache=True)
+    if hist is None or hist.empty:
+        # 抛出异常使空结果不被缓存，下次重跑时重新尝试
+        raise LookupError(code)
+    # 日期解析随结果一起缓存，重跑时无需对每只股票重复解析
+    if "日期" in hist.columns and not pd.api.types.is_datetime64_any_dtype(hist["日期"]):
+        hist["日期"] = pd.to_datetime(hist["日期"], errors="coerce")
+    return hist
+
+
+@st.cache_data(ttl=1.0, show_spinner=False)
+def _snapshot() -> pd.DataFrame:
+    # 快照/状态文件在同一秒内的多次重跑只读取解析一次
+    return read_latest_snapshot()
+
+
+@st.cache_data(ttl=1.0, show_spinner=False)
+def _service_status() -> dict:
+    return read_service_status()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _csv_bytes(version: int, _df: pd.DataFrame) -> bytes:
+    # 以结果版本号为缓存键（下划线参数不参与哈希），避免每次重跑都重新序列化整张结果表
+    return _df.to_csv(index=False).encode("utf-8-sig")
+
+
+def _result_csv(df: pd.DataFrame, version: int | None) -> bytes:
+    if version is None:
+        return df.to_csv(index=False).encode("utf-8-sig")
+    return _csv_bytes(version, df)
+
 
+def _code_list(df: pd.DataFrame) -> List[str]:
+    if "代码" not in df.columns:
+        return []
+    col = df["代码"]
+    # 已是字符串列时直接取值，避免 astype(str) 复制整列
+    if pd.api.types.is_string_dtype(col) and not col.isna().any():
+        return col.tolist()
+    return col.astype(str).tolist()
 
-@st.cache_data(show_spinner=False)
-def run_screening(date: str) -> pd.DataFrame:
-    return get_strong_stocks_comprehensive(date)
 
-def run_screening_with_progress(date: str):
+@st.cache_data(show_spinner=False, max_entries=4)
+def _codes_by_version(version: int, _df: pd.DataFrame) -> List[str]:
+    return _code_list(_df)
+
+
+def _result_codes(df: pd.DataFrame, version: int | None) -> List[str]:
+    # 与下载数据相同，按结果版本号缓存代码列表，重跑时不再重新提取
+    if version is None:
+        return _code_list(df)
+    return _codes_by_version(version, df)
+
+
+def _finite_series(date_index: pd.DatetimeIndex, values: np.ndarray, valid_date: np.ndarray, name: str) -> pd.Series:
+    mask = valid_date & np.isfinite(values)
+    if mask.all():
+        # 常见情况：无需过滤，各序列共用同一个日期索引
+        return pd.Series(values, index=date_index, name=name, copy=False)
+    return pd.Series(values[mask], index=date_index[mask], name=name)
+
+
+@st.cache_resource
+def _fetch_pool(max_workers: int) -> ThreadPoolExecutor:
+    # 线程池按并发数在各次重跑与会话间复用，避免每次重跑重建线程
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-hist")
+
+
+HIST_MEMO_MAX = 200  # 每个会话内存中保留的区间日线数量上限
+HIST_MEMO_TTL_SEC = 3600  # 与 _cached_hist 的 TTL 一致
+
+
+def load_hist(code: str, start_date: str, end_date: str) -> pd.DataFrame:
+    try:
+        return _cached_hist(code, start_date, end_date)
+    except LookupError:
+        return pd.DataFrame()
+
+
+SCREENING_TTL_SEC = 600  # 同一目标日与配置的筛选结果复用时长
+
+
+@st.cache_resource
+def _screening_results() -> dict:
+    # (目标日, 配置字段值) -> (完成时刻, 结果表, 统计)，各会话共享
+    return {}
+
+
+def run_screening_with_progress(date: str, cfg: Config):
+    """运行筛选并展示分阶段进度；10 分钟内相同目标日与配置的再次运行直接返回上次结果。"""
+    key = (date, dataclasses.astuple(cfg))
+    store = _screening_results()
+    now = time.monotonic()
+    hit = store.get(key)
+    if hit is not None and now - hit[0] < SCREENING_TTL_SEC:
+        st.progress(100)
+        st.caption(f"使用 {int(now - hit[0])} 秒前的筛选结果（相同目标日与参数）")
+        return hit[1].copy(), dict(hit[2])
+
+    # 侧边栏的请求间隔作用于进程内共享的令牌桶
+    set_request_interval(cfg.per_request_sleep_sec)
     steps_total = 5
     prog = st.progress(0)
     step_text = st.empty()
     def _cb(step_idx: int, label: str):
         prog.progress(int(max(0, min(step_idx, steps_total)) / steps_total * 100))
         step_text.write(f"阶段 {step_idx}/{steps_total}: {label}")
-    df, stats = get_strong_stocks_comprehensive_with_stats(date, progress_cb=_cb)
+    # 筛选策略模块只在运行筛选时用到，此处再导入，不拖慢首屏；重复导入只是一次 sys.modules 查找
+    from alphahunter.strategies import get_strong_stocks_comprehensive_with_stats
+
+    df, stats = get_strong_stocks_comprehensive_with_stats(date, progress_cb=_cb, cfg=cfg)
     prog.progress(100)
+    # 仅缓存非空结果（空结果多为数据源异常，应允许立即重试）；写入前清理过期条目
+    if df is not None and not df.empty:
+        for k, v in list(store.items()):
+            if now - v[0] >= SCREENING_TTL_SEC:
+                store.pop(k, None)
+        # 存入副本：返回给本会话的 df 会进入 session_state，不能与跨会话共享的缓存是同一对象
+        store[key] = (time.monotonic(), df.copy(), dict(stats))
     return df, stats
 
 
 @st.cache_data(ttl=600, show_spinner=False)  # 缓存10分钟，给足够时间获取数据
 def get_realtime_prices():
     """获取实时行情数据，带重试机制"""
-    import time
     max_retries = 3
     retry_delay = 2  # 秒
     
@@ -240,35 +453,208 @@ def merge_realtime_prices(result_df: pd.DataFrame) -> pd.DataFrame:
     return merged
 
 
+def _render_tracking_tab(hist: pd.DataFrame, close: np.ndarray, rsi: np.ndarray, macd_hist: np.ndarray, target_dt64: np.datetime64) -> None:
+    """渲染单只股票的跟踪标签页：数据源标注、价格/RSI/MACD 图与简要评估。"""
+    dates = hist["日期"].to_numpy()
+
+    # 简要数据源标注
+    if "source" in hist.columns:
+        st.caption(f"数据源：{hist['source'].iloc[0]}")
+
+    # 数据清理：去除无效日期与非有限值，避免 Vega-Lite Infinity 告警
+    # 每列一次布尔掩码（有效日期且数值有限）+ 一次取数，不构造中间DataFrame
+    valid_date = ~np.isnat(dates)
+    date_index = pd.DatetimeIndex(dates, name="日期")
+    price_s = _finite_series(date_index, close, valid_date, "close")
+    rsi_s = _finite_series(date_index, rsi, valid_date, "RSI")
+    macd_s = _finite_series(date_index, macd_hist, valid_date, "MACD_hist")
+
+    # 上方K线/收盘价折线，下方RSI与MACD柱体
+    if not price_s.empty:
+        st.line_chart(price_s, height=200)
+    else:
+        st.warning("价格序列为空或全部为无效值，无法绘图")
+    if not rsi_s.empty:
+        st.line_chart(rsi_s, height=150)
+    else:
+        st.info("RSI 序列为空或全部为无效值")
+    if not macd_s.empty:
+        st.bar_chart(macd_s, height=150)
+    else:
+        st.info("MACD 柱体序列为空或全部为无效值")
+
+    # 简单评估：从目标日到最新日的收益率（若目标日在区间内）
+    perf_col = st.columns(3)
+    try:
+        if len(dates) > 0:
+            # 日线按日期升序排列：二分查找目标日位置
+            pos = int(dates.searchsorted(target_dt64))
+            if pos < len(dates) and dates[pos] == target_dt64:
+                start_close = float(close[pos])
+                last_close = float(close[-1])
+                ret = (last_close / start_close - 1.0) * 100.0
+                perf_col[0].metric("自目标日起收益率%", f"{ret:.2f}%")
+            else:
+                perf_col[0].write("目标日不在跟踪区间内")
+        perf_col[1].metric("最新收盘价", f"{close[-1]:.2f}")
+        perf_col[2].metric("RSI(末值)", f"{rsi[-1]:.1f}")
+    except Exception:
+        pass
+
+
+@st.fragment
+def _render_tracking(codes: List[str], target_date: str) -> None:
+    """跟踪代码选择与价格跟踪可视化：作为 fragment 渲染，更改选中代码只重跑本函数而非整页。"""
+    # 注意：避免同时使用 default 参数与 Session State 赋值，
+    # 否则会出现“The widget with key ... was created with a default value but also had its value set via the Session State API.”告警。
+    st.multiselect(
+        "选择需要跟踪的股票代码",
+        options=codes,
+        key="selected_codes",
+        help="选择后仅重绘价格跟踪区域，已选项会被保留。",
+    )
+    selected_codes = list(st.session_state.get("selected_codes") or [])
+    # 用户更改选中项后持久化保存：此处只可能改变选中代码，其余状态不重复写出
+    _mark_dirty(selected_codes=selected_codes)
+    if not selected_codes:
+        return
+
+    end_date = yyyyMMdd(today)
+    start_date = yyyyMMdd(today - dt.timedelta(days=track_days))
+    target_dt64 = pd.Timestamp(target_date).to_datetime64()
+    tabs = st.tabs([f"{code}" for code in selected_codes])
+    progress = st.progress(0)
+    total_codes = len(selected_codes)
+    # 进度最多推送约 20 次（每 step 只或最后一只时），且仅在整数百分比变化时推送，减少前端消息
+    step = max(1, total_codes // 20)
+    last_pct = 0
+
+    def _advance(done: int) -> None:
+        nonlocal last_pct
+        if done % step and done != total_codes:
+            return
+        pct = int(done / total_codes * 100)
+        if pct != last_pct:
+            progress.progress(pct)
+            last_pct = pct
+
+    sources: List[str] = []
+    failed_codes: List[str] = []
+    # 会话内先查已取过的区间日线：普通字典查找，免去 st.cache_data 每次命中时的反序列化
+    memo: OrderedDict = st.session_state.setdefault("hist_memo", OrderedDict())
+    now = time.monotonic()
+    hists: dict[str, pd.DataFrame] = {}
+    for code in selected_codes:
+        hit = memo.get((code, start_date, end_date))
+        if hit is not None and now - hit[0] < HIST_MEMO_TTL_SEC:
+            memo.move_to_end((code, start_date, end_date))
+            hists[code] = hit[1]
+    # 其余代码一次性提交历史拉取，再汇总结果
+    pool = _fetch_pool(int(fetch_workers))
+    futures = {code: pool.submit(load_hist, code, start_date, end_date) for code in selected_codes if code not in hists}
+    for code, fut in futures.items():
+        try:
+            hists[code] = fut.result()
+        except Exception:
+            hists[code] = pd.DataFrame()
+        if not hists[code].empty:
+            memo[(code, start_date, end_date)] = (now, hists[code])
+    while len(memo) > HIST_MEMO_MAX:
+        memo.popitem(last=False)
+    # 全部收盘价一次批量计算 RSI/MACD，标签页内只做查表
+    closes = {
+        code: ensure_numeric(hist["close"]).to_numpy(dtype=np.float64, na_value=np.nan)
+        for code, hist in hists.items()
+        if not hist.empty and "close" in hist.columns
+    }
+    indicators = compute_rsi_macd_batch(
+        closes,
+        window=DEFAULT_CONFIG.rsi_window,
+        fast=DEFAULT_CONFIG.macd_fast,
+        slow=DEFAULT_CONFIG.macd_slow,
+        signal=DEFAULT_CONFIG.macd_signal,
+    )
+    for idx, (tab, code) in enumerate(zip(tabs, selected_codes), start=1):
+        with tab:
+            hist = hists[code]
+            if hist.empty:
+                failed_codes.append(code)
+                st.warning("该股票区间数据不可用（已自动重试多个数据源）")
+                _advance(idx)
+                continue
+            if "source" in hist.columns:
+                sources.append(str(hist["source"].iat[0]))
+            # 列检查（日期已在 _cached_hist 中解析）
+            if "close" not in hist.columns:
+                st.warning("缺少收盘价，无法绘图")
+                _advance(idx)
+                continue
+            # 指标保持为 numpy 数组，不再逐列写回 hist
+            rsi, macd_hist = indicators[code]
+            _render_tracking_tab(hist, closes[code], rsi, macd_hist, target_dt64)
+
+        _advance(idx)
+
+    # 统计数据源
+    src_counts = Counter(sources)
+    source_counts = {k: src_counts[k] for k in ("em", "sina", "tx")}
+    with st.expander("数据源与失败统计"):
+        total = len(selected_codes)
+        st.write({"总数": total, "失败数": len(failed_codes), "东财": source_counts["em"], "新浪": source_counts["sina"], "腾讯": source_counts["tx"]})
+        if failed_codes:
+            st.write("失败代码：", ", ".join(failed_codes))
+
+
+if clear_cache_btn:
+    removed = df_cache.clear()
+    st.cache_data.clear()
+    _screening_results().clear()
+    st.session_state.pop("hist_memo", None)
+    st.sidebar.success(f"已清除 {removed} 个缓存文件")
+
 if run_btn:
-    apply_indicator_config()
     with st.spinner("正在获取并筛选强势股..."):
-        result_df, stats = run_screening_with_progress(target_date)
+        result_df, stats = run_screening_with_progress(target_date, build_indicator_config())
     # 写入会话状态，避免后续交互导致数据丢失
     st.session_state["result_df"] = result_df
     st.session_state["stats"] = stats
+    # 结果表版本号：仅在此处重新赋值结果时更新，持久化时据此判断是否需要重写
+    st.session_state["result_df_version"] = time.time_ns()
+    st.session_state["result_date"] = target_date
     # 初始化默认选中
     if result_df is not None and not result_df.empty:
-        codes_default = result_df["代码"].astype(str).tolist()[: min(10, len(result_df))] if "代码" in result_df.columns else []
+        codes_default = _result_codes(result_df, st.session_state["result_df_version"])[:10]
         st.session_state["selected_codes"] = codes_default
     # 持久化到本地文件，便于下次自动恢复
-    _save_ui_state(st.session_state.get("result_df"), st.session_state.get("stats"), st.session_state.get("selected_codes"), target_date)
-else:
-    # 若未点击运行按钮，尝试从本地文件恢复上次状态
+    _mark_dirty(
+        result_df=st.session_state.get("result_df"),
+        result_version=st.session_state.get("result_df_version"),
+        stats=st.session_state.get("stats"),
+        selected_codes=list(st.session_state.get("selected_codes") or []),
+        date_str=target_date,
+    )
+elif "result_date" not in st.session_state:
+    # 若未点击运行按钮，每个会话仅在首次运行时从本地文件恢复上次状态；
+    # 之后的重跑直接使用会话状态，不再重复读盘，也不会用旧文件覆盖新的选择
+    st.session_state["result_date"] = None
     try:
         res_df, stats_obj, codes, last_date = _load_ui_state()
         if res_df is not None and not res_df.empty:
             st.session_state["result_df"] = res_df
+            # 恢复的结果同样分配版本号，使下载数据与代码列表可按版本缓存
+            st.session_state["result_df_version"] = time.time_ns()
         if isinstance(stats_obj, dict):
             st.session_state["stats"] = stats_obj
         if codes:
             st.session_state["selected_codes"] = codes
-        # 若用户未选择目标日，则使用上次目标日
-        if last_date:
-            target_date = last_date
+        st.session_state["result_date"] = last_date
     except Exception:
         pass
 
+# 未点击运行按钮的重跑沿用当前结果对应的目标日
+if not run_btn and st.session_state.get("result_date"):
+    target_date = st.session_state["result_date"]
+
 # 渲染：无论是否点击过"运行筛选"，只要有结果就展示并可交互
 result_df = st.session_state.get("result_df")
 stats = st.session_state.get("stats")
@@ -292,9 +678,6 @@ if result_df is not None and not result_df.empty:
     
     # 自动刷新提示和实现（只在交易时段刷新）
     if auto_refresh:
-        import time
-        from datetime import datetime
-        
         # 检查当前是否在交易时段
         is_trading = is_trading_time_now()
         
@@ -335,18 +718,9 @@ if result_df is not None and not result_df.empty:
     st.dataframe(display_df, use_container_width=True)
 
     # 选择个股进行跟踪（持久化选中项）
-    codes = result_df["代码"].astype(str).tolist() if "代码" in result_df.columns else []
-    # 注意：避免同时使用 default 参数与 Session State 赋值，
-    # 否则会出现“The widget with key ... was created with a default value but also had its value set via the Session State API.”告警。
-    st.multiselect(
-        "选择需要跟踪的股票代码",
-        options=codes,
-        key="selected_codes",
-        help="选择后页面即会重载，但已选项会被保留。",
-    )
-
-    # 每次用户更改选中项后，持久化保存
-    _save_ui_state(st.session_state.get("result_df"), st.session_state.get("stats"), st.session_state.get("selected_codes"), target_date)
+    codes = _result_codes(result_df, st.session_state.get("result_df_version"))
+    # 选择框与价格跟踪同在一个 fragment 内：更改选择只重跑该片段，下方实时快照的过滤在下次整页重跑时更新
+    _render_tracking(codes, target_date)
 
     # 实时状态与提醒设置
     st.markdown("---")
@@ -356,7 +730,7 @@ if result_df is not None and not result_df.empty:
     persisted_codes = []
     try:
         if SELECTED_CODES_PATH.exists():
-            persisted_codes = json.loads(SELECTED_CODES_PATH.read_text(encoding="utf-8"))
+            persisted_codes = _load_json(SELECTED_CODES_PATH)
     except Exception:
         pass
     default_codes = st.session_state.get("selected_codes", persisted_codes if persisted_codes else cfg.get("tracked_codes", []))
@@ -375,6 +749,7 @@ if result_df is not None and not result_df.empty:
                 "poll_interval_sec": int(poll_minutes * 60),
                 "alert_threshold_pct": float(alert_thresh),
                 "retention_days": int(retention_days),
+                "mirror_csv": bool(cfg.get("mirror_csv", False)),
             }
             rt_save_config(new_cfg)
             st.success("配置已保存。后台服务将读取此配置。")
@@ -382,7 +757,7 @@ if result_df is not None and not result_df.empty:
     trading = is_trading_time_now()
     st.caption(f"交易时段状态：{'在交易' if trading else '休市'}")
 
-    latest_df = read_latest_snapshot()
+    latest_df = _snapshot()
     if latest_df is None or len(latest_df) == 0:
         st.info("尚无实时快照，请启动后台服务进程以采集数据。")
         st.code("python -m alphahunter.realtime_service", language="bash")
@@ -395,97 +770,10 @@ if result_df is not None and not result_df.empty:
         cols = [c for c in ["采集时间", "代码", "名称", "最新价", "close", "pct_chg", "alert", "状态"] if c in show_df.columns]
         st.dataframe(show_df[cols], use_container_width=True)
 
-    # 价格跟踪可视化
-    selected_codes = st.session_state.get("selected_codes", [])
-    if selected_codes:
-        end_date = yyyyMMdd(today)
-        start_date = yyyyMMdd(today - dt.timedelta(days=track_days))
-        tabs = st.tabs([f"{code}" for code in selected_codes])
-        progress = st.progress(0)
-        source_counts = {"em": 0, "sina": 0, "tx": 0}
-        failed_codes: List[str] = []
-        for idx, (tab, code) in enumerate(zip(tabs, selected_codes), start=1):
-            with tab:
-                hist = get_symbol_hist_range(code, start_date=start_date, end_date=end_date, use_cache=True)
-                if hist is None or hist.empty:
-                    failed_codes.append(code)
-                    st.warning("该股票区间数据不可用（已自动重试多个数据源）")
-                    progress.progress(int(idx / len(selected_codes) * 100))
-                    continue
-                hist = hist.copy()
-                # 统计数据源
-                if "source" in hist.columns:
-                    src = str(hist["source"].iloc[0])
-                    if src in source_counts:
-                        source_counts[src] += 1
-                # 日期与列检查与清理
-                if "日期" in hist.columns:
-                    hist["日期"] = pd.to_datetime(hist["日期"], errors="coerce")
-                if "close" not in hist.columns:
-                    st.warning("缺少收盘价，无法绘图")
-                    progress.progress(int(idx / len(selected_codes) * 100))
-                    continue
-                # 指标计算
-                close = pd.to_numeric(hist["close"], errors="coerce")
-                hist["close"] = close
-                hist["RSI"] = compute_rsi(close, window=DEFAULT_CONFIG.rsi_window)
-                macd_df = compute_macd(close, fast=DEFAULT_CONFIG.macd_fast, slow=DEFAULT_CONFIG.macd_slow, signal=DEFAULT_CONFIG.macd_signal)
-                hist["MACD_hist"] = macd_df["hist"].values
-
-                # 简要数据源标注
-                if "source" in hist.columns:
-                    st.caption(f"数据源：{hist['source'].iloc[0]}")
-
-                # 数据清理：去除无效日期与非有限值，避免 Vega-Lite Infinity 告警
-                price_df = hist[["日期", "close"]].dropna().copy()
-                price_df = price_df[np.isfinite(price_df["close"])]
-                rsi_df = hist[["日期", "RSI"]].dropna().copy()
-                rsi_df = rsi_df[np.isfinite(rsi_df["RSI"])]
-                macd_plot_df = hist[["日期", "MACD_hist"]].dropna().copy()
-                macd_plot_df = macd_plot_df[np.isfinite(macd_plot_df["MACD_hist"])]
-
-                # 上方K线/收盘价折线，下方RSI与MACD柱体
-                if not price_df.empty:
-                    st.line_chart(price_df.set_index("日期")["close"], height=200)
-                else:
-                    st.warning("价格序列为空或全部为无效值，无法绘图")
-                if not rsi_df.empty:
-                    st.line_chart(rsi_df.set_index("日期")["RSI"], height=150)
-                else:
-                    st.info("RSI 序列为空或全部为无效值")
-                if not macd_plot_df.empty:
-                    st.bar_chart(macd_plot_df.set_index("日期")["MACD_hist"], height=150)
-                else:
-                    st.info("MACD 柱体序列为空或全部为无效值")
-
-                # 简单评估：从目标日到最新日的收益率（若目标日在区间内）
-                perf_col = st.columns(3)
-                try:
-                    if "日期" in hist.columns and "close" in hist.columns:
-                        if pd.to_datetime(target_date) in hist["日期"].values:
-                            start_close = float(hist.loc[hist["日期"] == pd.to_datetime(target_date), "close"].iloc[0])
-                            last_close = float(hist["close"].iloc[-1])
-                            ret = (last_close / start_close - 1.0) * 100.0
-                            perf_col[0].metric("自目标日起收益率%", f"{ret:.2f}%")
-                        else:
-                            perf_col[0].write("目标日不在跟踪区间内")
-                    perf_col[1].metric("最新收盘价", f"{hist['close'].iloc[-1]:.2f}")
-                    perf_col[2].metric("RSI(末值)", f"{hist['RSI'].iloc[-1]:.1f}")
-                except Exception:
-                    pass
-
-            progress.progress(int(idx / len(selected_codes) * 100))
-
-        with st.expander("数据源与失败统计"):
-            total = len(selected_codes)
-            st.write({"总数": total, "失败数": len(failed_codes), "东财": source_counts["em"], "新浪": source_counts["sina"], "腾讯": source_counts["tx"]})
-            if failed_codes:
-                st.write("失败代码：", ", ".join(failed_codes))
-
     # 导出筛选结果
     st.download_button(
         label="下载筛选结果CSV",
-        data=result_df.to_csv(index=False, encoding="utf-8-sig"),
+        data=_result_csv(result_df, st.session_state.get("result_df_version")),
         file_name=f"strong_stocks_{target_date}.csv",
         mime="text/csv",
     )
@@ -497,7 +785,7 @@ st.markdown("---")
 st.subheader("实时服务控制与状态")
 
 # 控制按钮
-col_ctrl = st.columns(4)
+col_ctrl = st.columns(5)
 with col_ctrl[0]:
     if st.button("启动实时服务"):
         # 在启动前同步 tracked_codes 到配置，确保服务能采集
@@ -506,7 +794,7 @@ with col_ctrl[0]:
         if not codes_for_service:
             try:
                 if SELECTED_CODES_PATH.exists():
-                    codes_for_service = json.loads(SELECTED_CODES_PATH.read_text(encoding="utf-8"))
+                    codes_for_service = _load_json(SELECTED_CODES_PATH)
             except Exception:
                 codes_for_service = []
         if codes_for_service:
@@ -515,6 +803,7 @@ with col_ctrl[0]:
                 "poll_interval_sec": int(cfg.get("poll_interval_sec", 300)),
                 "alert_threshold_pct": float(cfg.get("alert_threshold_pct", 3.0)),
                 "retention_days": int(cfg.get("retention_days", 7)),
+                "mirror_csv": bool(cfg.get("mirror_csv", False)),
             }
             rt_save_config(new_cfg)
         set_service_control(paused=False, stop=False)
@@ -535,9 +824,13 @@ with col_ctrl[3]:
     if st.button("继续服务"):
         set_service_control(paused=False, stop=False)
         st.success("已请求继续运行后台服务。")
+with col_ctrl[4]:
+    if st.button("刷新状态"):
+        _snapshot.clear()
+        _service_status.clear()
 
 # 状态与进度显示
-status = read_service_status() or {}
+status = _service_status() or {}
 running = bool(status.get("running", False))
 paused = bool(status.get("paused", False))
 stop_req = bool(status.get("stop_requested", False))
@@ -568,32 +861,74 @@ with cols[2]:
     except Exception:
         st.metric("运行时长", "-")
 
-# 服务日志输出与历史记录
-st.markdown("### 服务日志输出")
-log_dir = Path(DEFAULT_CONFIG.cache_dir) / "realtime" / "logs"
-today_str = dt.datetime.now().strftime("%Y%m%d")
-log_path = log_dir / f"prices_{today_str}.csv"
-if log_path.exists():
-    try:
-        log_df = pd.read_csv(log_path)
-        st.dataframe(log_df.tail(50), use_container_width=True)
-    except Exception as e:
-        st.error(f"读取日志失败：{e}")
-else:
-    st.info("暂无当日日志，服务可能尚未运行或尚未采集。")
-
-st.markdown("### 历史进度记录")
-hist_counts = []
-if log_dir.exists():
-    for p in sorted(log_dir.glob("prices_*.csv"))[-5:]:
+@st.cache_data(max_entries=8, show_spinner=False)
+def _tail_log(path: Path, size: int, mtime_ns: int, n: int = 50) -> pd.DataFrame:
+    """只解析日志的表头与最后 n 行。
+
+    gzip 日志无法随机定位，流式解压时仅保留最后 n 行；未压缩的旧日志从文件末尾回读 64KB。
+    size/mtime_ns 仅作缓存键：日志未追加时各会话的定时刷新直接命中缓存，不再重复解压。
+    """
+    if path.suffix == ".gz":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = f.readline()
+            lines = deque(f, maxlen=n)
+        return pd.read_csv(io.StringIO(header + "".join(lines)))
+    with path.open("rb") as f:
+        header = f.readline().decode("utf-8")
+        start = f.tell()
+        size = f.seek(0, io.SEEK_END)
+        f.seek(max(start, size - 64 * 1024))
+        chunk = f.read().decode("utf-8", errors="ignore")
+    lines = chunk.splitlines(keepends=True)
+    if size - 64 * 1024 > start and lines:
+        lines = lines[1:]  # 丢弃被截断的首行
+    return pd.read_csv(io.StringIO(header + "".join(lines[-n:])))
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _fast_rowcount(path: Path, size: int, mtime_ns: int) -> int:
+    """按换行符计数数据行（扣除表头），无需解析CSV；gzip 日志流式解压计数。
+
+    size/mtime_ns 仅作缓存键：往日日志不再变化，每个文件只解压计数一次。
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        return sum(buf.count(b"\n") for buf in iter(lambda: f.read(1 << 20), b"")) - 1
+
+
+# 服务日志输出与历史记录：独立 fragment 定时刷新，不触发整页重跑
+@st.fragment(run_every=dt.timedelta(seconds=30))
+def _render_service_logs() -> None:
+    st.markdown("### 服务日志输出")
+    log_dir = Path(DEFAULT_CONFIG.cache_dir) / "realtime" / "logs"
+    today_str = dt.datetime.now().strftime("%Y%m%d")
+    log_path = log_dir / f"prices_{today_str}.csv.gz"
+    if not log_path.exists():
+        # 兼容旧版未压缩日志
+        log_path = log_dir / f"prices_{today_str}.csv"
+    if log_path.exists():
         try:
-            dfp = pd.read_csv(p)
-            hist_counts.append((p.name, len(dfp)))
-        except Exception:
-            pass
-    for gz in sorted(log_dir.glob("prices_*.csv.gz"))[-5:]:
-        hist_counts.append((gz.name, None))
-if hist_counts:
-    st.write({name: (count if count is not None else "gz存档") for name, count in hist_counts})
-else:
-    st.write("暂无历史记录")
\ No newline at end of file
+            stat = log_path.stat()
+            log_df = _tail_log(log_path, stat.st_size, stat.st_mtime_ns, 50)
+            st.dataframe(log_df, use_container_width=True)
+        except Exception as e:
+            st.error(f"读取日志失败：{e}")
+    else:
+        st.info("暂无当日日志，服务可能尚未运行或尚未采集。")
+
+    st.markdown("### 历史进度记录")
+    hist_counts = []
+    if log_dir.exists():
+        for p in sorted(log_dir.glob("prices_*.csv*"))[-5:]:
+            try:
+                stat = p.stat()
+                hist_counts.append((p.name, _fast_rowcount(p, stat.st_size, stat.st_mtime_ns)))
+            except Exception:
+                hist_counts.append((p.name, None))
+    if hist_counts:
+        st.write({name: (count if count is not None else "读取失败") for name, count in hist_counts})
+    else:
+        st.write("暂无历史记录")
+
+
+_render_service_logs()
@@ -5,9 +5,11 @@
 用于调试实时价格和涨跌额显示问题
 """
 
+import random
 import sys
 from pathlib import Path
 import time
+from contextlib import contextmanager
 
 # 添加 src 目录到 Python 路径
 ROOT = Path(__file__).resolve().parent
@@ -15,9 +17,38 @@ sys.path.append(str(ROOT / "src"))
 
 from alphahunter.data_fetch import get_realtime_spot
 from alphahunter.processing import clean_spot_df
+import numpy as np
 import pandas as pd
 
 
+@contextmanager
+def _pooled_session():
+    """在 with 块内让 akshare 内部的 requests.get/post 走同一个连接池 Session，退出时恢复原函数。
+
+    akshare 未提供传入 Session 的接口，直接调用模块级 requests.get；
+    仅在重试期间临时替换，使重试时复用已建立的 keep-alive 连接，省去重复的 TCP/TLS 握手。
+    """
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+    except ImportError:  # pragma: no cover - requests 随 akshare 安装
+        yield None
+        return
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    orig_get, orig_post = requests.get, requests.post
+    # 保持 requests.get(url, params=None, **kw) / requests.post(url, data=None, json=None, **kw) 的调用约定
+    requests.get = lambda url, params=None, **kw: session.get(url, params=params, **kw)
+    requests.post = lambda url, data=None, json=None, **kw: session.post(url, data=data, json=json, **kw)
+    try:
+        yield session
+    finally:
+        requests.get, requests.post = orig_get, orig_post
+        session.close()
+
+
 def test_realtime_data():
     """测试实时数据获取"""
     print("=" * 60)
@@ -26,40 +57,44 @@ def test_realtime_data():
     
     # 1. 获取实时数据（带重试机制）
     print("\n1. 获取实时行情数据...")
-    max_retries = 3
-    retry_delay = 2
+    max_retries = 5
+    # 指数退避 + 随机抖动：短暂限频时更快恢复，且避免多次重试同时打到数据源
+    base_delay, max_delay, jitter = 0.5, 8.0, 0.5
     spot = None
     
-    for attempt in range(max_retries):
-        try:
-            print(f"   尝试第 {attempt + 1}/{max_retries} 次...")
-            spot = get_realtime_spot(use_cache=False)
-            if spot is None or spot.empty:
-                print(f"   ⚠ 获取的数据为空")
+    with _pooled_session():
+        for attempt in range(max_retries):
+            try:
+                print(f"   尝试第 {attempt + 1}/{max_retries} 次...")
+                spot = get_realtime_spot(use_cache=False)
+                if spot is None or spot.empty:
+                    print(f"   ⚠ 获取的数据为空")
+                    if attempt < max_retries - 1:
+                        retry_delay = min(max_delay, base_delay * 2 ** attempt) + random.random() * jitter
+                        print(f"   等待 {retry_delay:.1f} 秒后重试...")
+                        time.sleep(retry_delay)
+                        continue
+                else:
+                    print(f"   ✓ 成功获取 {len(spot)} 条实时数据")
+                    break
+            except Exception as e:
+                error_msg = str(e)
+                print(f"   ✗ 错误: {error_msg}")
                 if attempt < max_retries - 1:
-                    print(f"   等待 {retry_delay} 秒后重试...")
+                    retry_delay = min(max_delay, base_delay * 2 ** attempt) + random.random() * jitter
+                    print(f"   等待 {retry_delay:.1f} 秒后重试...")
                     time.sleep(retry_delay)
-                    continue
-            else:
-                print(f"   ✓ 成功获取 {len(spot)} 条实时数据")
-                break
-        except Exception as e:
-            error_msg = str(e)
-            print(f"   ✗ 错误: {error_msg}")
-            if attempt < max_retries - 1:
-                print(f"   等待 {retry_delay} 秒后重试...")
-                time.sleep(retry_delay)
-            else:
-                print(f"\n✗✗✗ 所有重试都失败了！")
-                print("\n可能的原因：")
-                print("  1. 网络连接问题 - 请检查网络连接")
-                print("  2. akshare API 限频 - 请稍后再试")
-                print("  3. 数据源服务器问题 - 请稍后再试")
-                print("\n建议：")
-                print("  - 稍等几分钟后再次运行")
-                print("  - 检查是否能访问东方财富网站")
-                print("  - 尝试更新 akshare: pip install --upgrade akshare")
-                return
+                else:
+                    print(f"\n✗✗✗ 所有重试都失败了！")
+                    print("\n可能的原因：")
+                    print("  1. 网络连接问题 - 请检查网络连接")
+                    print("  2. akshare API 限频 - 请稍后再试")
+                    print("  3. 数据源服务器问题 - 请稍后再试")
+                    print("\n建议：")
+                    print("  - 稍等几分钟后再次运行")
+                    print("  - 检查是否能访问东方财富网站")
+                    print("  - 尝试更新 akshare: pip install --upgrade akshare")
+                    return
     
     if spot is None or spot.empty:
         print("\n✗ 未能获取到有效数据")
@@ -80,23 +115,23 @@ def test_realtime_data():
         print(f"✗ 数据清洗失败: {e}")
         spot_clean = spot
     
+    # 清洗后的列名集合，以下各步的存在性检查均做哈希查找
+    cols_set = frozenset(spot_clean.columns)
+
     # 4. 检查关键列
     print("\n4. 检查关键列:")
     key_cols = ["代码", "名称", "最新价", "现价", "价格", "涨跌额", "涨跌值", "涨跌", "pct_chg", "涨跌幅"]
     for col in key_cols:
-        if col in spot_clean.columns:
+        if col in cols_set:
             print(f"   ✓ {col:10s} - 存在")
         else:
             print(f"   ✗ {col:10s} - 不存在")
     
     # 5. 显示示例数据
     print("\n5. 示例数据（前3条）:")
-    if "代码" in spot_clean.columns:
+    if "代码" in cols_set:
         # 选择重要的列显示
-        display_cols = ["代码"]
-        for col in ["名称", "最新价", "现价", "价格", "涨跌额", "涨跌值", "涨跌幅", "pct_chg"]:
-            if col in spot_clean.columns:
-                display_cols.append(col)
+        display_cols = ["代码"] + [c for c in ("名称", "最新价", "现价", "价格", "涨跌额", "涨跌值", "涨跌幅", "pct_chg") if c in cols_set]
         
         sample = spot_clean[display_cols].head(3)
         print(sample.to_string(index=False))
@@ -107,36 +142,32 @@ def test_realtime_data():
     print("\n6. 数据类型检查:")
     type_cols = ["最新价", "现价", "价格", "涨跌额", "涨跌值", "pct_chg"]
     for col in type_cols:
-        if col in spot_clean.columns:
+        if col in cols_set:
             dtype = spot_clean[col].dtype
             null_count = spot_clean[col].isnull().sum()
             print(f"   {col:10s}: dtype={dtype}, 空值数={null_count}/{len(spot_clean)}")
     
     # 7. 测试涨跌额计算
     print("\n7. 测试涨跌额计算:")
-    price_col = None
-    for col in ["最新价", "现价", "价格"]:
-        if col in spot_clean.columns:
-            price_col = col
-            break
+    price_col = next((c for c in ("最新价", "现价", "价格") if c in cols_set), None)
     
-    if price_col and "pct_chg" in spot_clean.columns:
+    if price_col and "pct_chg" in cols_set:
         print(f"   使用 {price_col} 和 pct_chg 计算涨跌额")
         try:
-            spot_clean["涨跌额_计算"] = (
-                pd.to_numeric(spot_clean[price_col], errors='coerce') * 
-                pd.to_numeric(spot_clean["pct_chg"], errors='coerce') / 100
-            ).round(2)
+            # 直接在 float64 数组上计算，避免中间 Series 的索引对齐
+            price = pd.to_numeric(spot_clean[price_col], errors='coerce').to_numpy(dtype=np.float64)
+            pct = pd.to_numeric(spot_clean["pct_chg"], errors='coerce').to_numpy(dtype=np.float64)
+            spot_clean["涨跌额_计算"] = np.round(price * pct * 0.01, 2)
             print(f"   ✓ 涨跌额计算成功")
             print(f"\n   示例（前3条）:")
             calc_cols = ["代码", price_col, "pct_chg", "涨跌额_计算"]
-            if "涨跌额" in spot_clean.columns:
+            if "涨跌额" in cols_set:
                 calc_cols.append("涨跌额")
             print(spot_clean[calc_cols].head(3).to_string(index=False))
         except Exception as e:
             print(f"   ✗ 涨跌额计算失败: {e}")
     else:
-        print(f"   ⚠ 缺少必要列（价格列={price_col}, pct_chg={'存在' if 'pct_chg' in spot_clean.columns else '不存在'}）")
+        print(f"   ⚠ 缺少必要列（价格列={price_col}, pct_chg={'存在' if 'pct_chg' in cols_set else '不存在'}）")
     
     print("\n" + "=" * 60)
     print("测试完成")